@@ -0,0 +1,96 @@
+import asyncio
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from db.indexes import ensure_match_indexes
+from db.match_queries import find_matches
+from db.mongo import AsyncMongoDB
+from db.names import NameDictionary, normalize_name
+
+# Needs a real mongod: MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_match_queries [docs]
+COLLECTION = 'bench_matches_data'
+DB_NAME = os.getenv('BENCH_DB_NAME', 'goal_bench')
+LEAGUES = 300
+TEAMS = 4000
+
+def seed(uri: str, total: int, batch: int = 10000):
+    collection = MongoClient(uri)[DB_NAME][COLLECTION]
+    if collection.estimated_document_count() == total:
+        print(f"Reusing {total} seeded documents")
+        return
+    collection.drop()
+    # Leagues get ids 1..LEAGUES, teams the ids after them
+    names = MongoClient(uri)[DB_NAME][f'{COLLECTION}_names']
+    names.drop()
+    names.insert_many(
+        [{'_id': 1 + n, 'kind': 'league', 'key': normalize_name(f"League {n}"), 'name': f"League {n}"} for n in range(LEAGUES)]
+        + [{'_id': 1 + LEAGUES + n, 'kind': 'team', 'key': normalize_name(f"Team {n}"), 'name': f"Team {n}"} for n in range(TEAMS)]
+    )
+    rng = random.Random(7)
+    start = datetime(2023, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, total, batch):
+        docs = []
+        for n in range(offset, min(offset + batch, total)):
+            date = start + timedelta(minutes=15 * (n // 8))
+            docs.append({
+                '_id': f"{date:%Y%m%d}_{n:07d}",
+                'league_id': 1 + rng.randrange(LEAGUES),
+                'date': date,
+                'home_team_id': 1 + LEAGUES + rng.randrange(TEAMS),
+                'away_team_id': 1 + LEAGUES + rng.randrange(TEAMS),
+                'odds': rng.choice(['0', '0.5', '0.5/1', '1']),
+                'score': f"{rng.randint(0, 4)} - {rng.randint(0, 4)}",
+                'previous_score': '0 - 0',
+                'time': f"{date:%H:%M}",
+                'bangkok_time': f"{date:%H:%M}",
+                'signal': rng.choice(['เจ้าบ้าน', 'ทีมเยือน', '']),
+            })
+        collection.insert_many(docs, ordered=False)
+    print(f"Seeded {total} documents in {time.perf_counter() - started:.1f}s")
+
+async def measure(name, func, runs=50):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    # Nearest rank, int() picked one sample too low whenever n * 0.95 was not whole
+    p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+    print(f"{name:<38} p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+
+async def run(uri: str):
+    client = AsyncMongoDB(uri, DB_NAME)
+    collection = client.db[COLLECTION]
+    names = NameDictionary(client.db[f'{COLLECTION}_names'], client.db[f'{COLLECTION}_counters'])
+    await ensure_match_indexes(collection)
+    day = datetime(2024, 6, 1)
+
+    async def walk_pages(pages=10, **filters):
+        cursor = None
+        for _ in range(pages):
+            page = await find_matches(collection, names, cursor=cursor, limit=100, **filters)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+    await measure('one day, first page', lambda: find_matches(collection, names, date_from=day, date_to=day + timedelta(days=1), limit=100))
+    await measure('one day, projected', lambda: find_matches(collection, names, date_from=day, date_to=day + timedelta(days=1), limit=100, fields=['home_team', 'away_team', 'score']))
+    await measure('league + 30 days', lambda: find_matches(collection, names, league='League 42', date_from=day, date_to=day + timedelta(days=30)))
+    await measure('team (home or away)', lambda: find_matches(collection, names, team='Team 1234'))
+    await measure('10 pages from a date (keyset)', lambda: walk_pages(date_from=day), runs=10)
+    client.close()
+
+if __name__ == "__main__":
+    uri = os.getenv('MONGODB_URI')
+    if not uri:
+        sys.exit("Set MONGODB_URI to a local mongod to run this benchmark")
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    seed(uri, total)
+    asyncio.run(run(uri))
@@ -0,0 +1,27 @@
+import sys
+import timeit
+from benchmarks.fixtures import load_fixture
+from benchmarks.legacy import legacy_parse_goal
+from goal_parser import available_backends, parse_day_tables
+
+def bench(func, repeat: int = 5, number: int = 3) -> float:
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+def main(size: str = 'medium'):
+    html = load_fixture(size)
+    print(f"Fixture: goal1_{size}.html ({len(html.encode('utf-8')) / 1024:.0f} KiB)")
+
+    expected = [legacy_parse_goal(html, index) for index in range(2)]
+    baseline = bench(lambda: legacy_parse_goal(html, 0))
+    print(f"{'legacy goal()':<22} {baseline * 1000:8.2f} ms   1.00x")
+
+    for backend in available_backends():
+        for index in range(2):
+            if parse_day_tables(html, index, backend) != expected[index]:
+                print(f"{backend}: output differs from legacy parser for index {index}")
+                sys.exit(1)
+        elapsed = bench(lambda: parse_day_tables(html, 0, backend))
+        print(f"{backend:<22} {elapsed * 1000:8.2f} ms {baseline / elapsed:6.2f}x")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import timeit
+from benchmarks.legacy import LegacyThaiDateConverter
+from utils.test_data import test_cases
+from utils.thai_date_utils import ThaiDateConverter, to_utc_format
+
+def per_call_us(func, number: int = 200) -> float:
+    # Invalid dates in test_cases print an error on every uncached call, keep that out of the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = min(timeit.repeat(func, repeat=5, number=number))
+    return elapsed / (number * len(test_cases)) * 1e6
+
+def main():
+    legacy = LegacyThaiDateConverter()
+    converter = ThaiDateConverter()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        changed = [case for case in test_cases if legacy.to_utc_format(case) != converter.to_utc_format(case)]
+
+    def run_legacy():
+        for case in test_cases:
+            legacy.to_utc_format(case)
+
+    def run_uncached():
+        to_utc_format.cache_clear()
+        for case in test_cases:
+            converter.to_utc_format(case)
+
+    def run_cached():
+        for case in test_cases:
+            converter.to_utc_format(case)
+
+    def run_many():
+        converter.to_utc_format_many(test_cases)
+
+    baseline = per_call_us(run_legacy)
+    print(f"{len(test_cases)} test cases, per-call latency")
+    for name, func in [
+        ('before (legacy)', run_legacy),
+        ('after, cold cache', run_uncached),
+        ('after, warm cache', run_cached),
+        ('to_utc_format_many', run_many),
+    ]:
+        elapsed = baseline if func is run_legacy else per_call_us(func)
+        print(f"{name:<20} {elapsed:8.3f} us {baseline / elapsed:7.1f}x")
+
+    # Only inputs using abbreviated month names (e.g. 'ก.ค.') should convert differently
+    for case in changed:
+        print(f"now parsed: {case} -> {converter.to_utc_format(case)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import db.mongo
+from db.mongo import AsyncMongoDB, get_async_mongo
+
+class FakeGoalServer:
+    # Serves a fixture page as goal1.co would (with an ETag) and accepts webhook POSTs as a sink
+    def __init__(self, html: str = ''):
+        self.html = html
+        self.page_requests = 0
+        self.not_modified = 0
+        self.webhooks = 0
+        self.server = None
+
+    def set_page(self, html: str):
+        self.html = html
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}/'
+
+    def start(self) -> 'FakeGoalServer':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fake.page_requests += 1
+                body = fake.html.encode('utf-8')
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    fake.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fake.webhooks += 1
+                self.send_response(204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+class FakeTelegramBot:
+    # Stands in for AsyncTeleBot in TelegramDeliveryQueue
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append((chat_id, text))
+
+def install_mongo(db_name: str = 'goal_bench') -> str:
+    # BENCH_MONGODB_URI points the suite at a local mongod, otherwise mongomock-motor stands in.
+    # Every component calling get_async_mongo() with the default env then gets this database.
+    uri = os.getenv('BENCH_MONGODB_URI')
+    if uri:
+        os.environ['MONGODB_URI'], os.environ['MONGODB_DB_NAME'] = uri, db_name
+        os.environ['MONGO_URI'], os.environ['MONGO_DB_NAME'] = uri, db_name
+        get_async_mongo(uri, db_name)
+        return 'mongod'
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Install mongomock-motor or set BENCH_MONGODB_URI to run the storage benchmarks")
+    uri = 'mongodb://mongomock'
+    os.environ['MONGODB_URI'], os.environ['MONGODB_DB_NAME'] = uri, db_name
+    os.environ['MONGO_URI'], os.environ['MONGO_DB_NAME'] = uri, db_name
+    mongo = AsyncMongoDB.__new__(AsyncMongoDB)
+    mongo.client = AsyncMongoMockClient()
+    mongo.db = mongo.client[db_name]
+    db.mongo._async_clients[(uri, db_name)] = mongo
+    return 'mongomock'
+
+async def reset_mongo(collections=('matches_data', 'match_timeline', 'match_state', 'notification_ledger', 'scheduled_jobs')):
+    mongo = get_async_mongo()
+    for name in collections:
+        await mongo.db[name].delete_many({})
@@ -0,0 +1,76 @@
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+THAI_DAYS = ['จันทร์', 'อังคาร', 'พุธ', 'พฤหัสบดี', 'ศุกร์', 'เสาร์', 'อาทิตย์']
+THAI_MONTHS = [
+    'มกราคม', 'กุมภาพันธ์', 'มีนาคม', 'เมษายน', 'พฤษภาคม', 'มิถุนายน',
+    'กรกฎาคม', 'สิงหาคม', 'กันยายน', 'ตุลาคม', 'พฤศจิกายน', 'ธันวาคม'
+]
+ODDS = ['0', '0/0.5', '0.5', '0.5/1', '1', '1/1.5', '1.5', '2', '-0.5', '-0.5/1']
+SIGNALS = ['เจ้าบ้าน', 'ทีมเยือน', 'สูง', 'ต่ำ', '']
+
+# (days, leagues per day, matches per league) for each recorded page size
+SIZES = {
+    'small': (1, 5, 4),
+    'medium': (2, 25, 6),
+    'large': (3, 60, 8),
+}
+
+def build_page(days: int, leagues: int, matches: int, seed: int = 1) -> str:
+    # Mirrors the goal1.co markup the scraper relies on, plus unrelated page chrome around it.
+    # Kickoffs run from 12:00 to 05:45, a day table continues past midnight like the real one.
+    rng = random.Random(seed)
+    out = [
+        '<!DOCTYPE html><html lang="th"><head><meta charset="utf-8"><title>ผลบอลสด goal1</title>',
+        '<script>var ads = [' + ','.join(str(i) for i in range(200)) + '];</script></head><body>',
+        '<div id="menu"><ul>' + ''.join(f'<li><a href="/news/{i}">ข่าวฟุตบอล {i}</a></li>' for i in range(60)) + '</ul></div>',
+        '<div id="todaytable">',
+    ]
+    for day in range(days):
+        out.append(
+            f'<div style="width:100%;border:1px #000 solid;margin-bottom:5px">'
+            f'<div class="head"><strong>โปรแกรมบอล วัน{THAI_DAYS[day % 7]}ที่ {day + 10} {THAI_MONTHS[(day + 6) % 12]} 2567</strong></div>'
+            f'<table width="100%" cellpadding="0" cellspacing="0">'
+        )
+        for league in range(leagues):
+            out.append(
+                f'<tr><td class="utable_league" colspan="7"><img src="/flag/{league}.png">&nbsp;'
+                f'ลีก {day}-{league} Premier&nbsp;League</td></tr>'
+            )
+            for match in range(matches):
+                home, away = f'ทีมเหย้า {league}-{match}', f'ทีมเยือน {league}-{match}'
+                out.append(
+                    '<tr>'
+                    f'<td class="utable_f1 f">{rng.randint(12, 29) % 24:02d}:{rng.choice(["00", "15", "30", "45"])}</td>'
+                    f'<td class="utable_f2 f"><a href="/team/{league}{match}h">{home}</a></td>'
+                    f'<td class="utable_f3 f classodds">{rng.choice(ODDS)}</td>'
+                    f'<td class="utable_f4 f"><span>{away}</span> <img src="/icon.png"></td>'
+                    f'<td class="utable_f7 f">{rng.randint(0, 2)} - {rng.randint(0, 2)}</td>'
+                    f'<td class="utable_f5 f classmore"><a href="/m/{league}{match}">{rng.randint(0, 4)} - {rng.randint(0, 4)}</a></td>'
+                    f'<td class="utable_f6 f">{rng.choice(SIGNALS)}&nbsp;</td>'
+                    '</tr>'
+                )
+        out.append('</table></div>')
+    out.append('</div>')
+    out.append('<div id="footer">' + ''.join(f'<p>บทความ {i} ' + 'ฟุตบอล ' * 20 + '</p>' for i in range(80)) + '</div>')
+    out.append('</body></html>')
+    return '\n'.join(out)
+
+def fixture_path(size: str) -> str:
+    return os.path.join(FIXTURES_DIR, f'goal1_{size}.html')
+
+def load_fixture(size: str = 'medium') -> str:
+    with open(fixture_path(size), encoding='utf-8') as f:
+        return f.read()
+
+def write_fixtures(sizes=None):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for size in sizes or SIZES:
+        with open(fixture_path(size), 'w', encoding='utf-8') as f:
+            f.write(build_page(*SIZES[size]))
+        print(f"Wrote {fixture_path(size)}")
+
+if __name__ == "__main__":
+    write_fixtures()
@@ -0,0 +1,102 @@
+# Reference copies of the original implementations, kept only so benchmarks
+# can compare against them and check that the new code produces the same output
+import re
+from datetime import datetime, timezone
+from bs4 import BeautifulSoup as Soup
+
+def format_string(s):
+    return ' '.join(s.replace('\xa0', ' ').split())
+
+def legacy_parse_goal(html, index=0):
+    data = []
+    converter = LegacyThaiDateConverter()
+    soup = Soup(html, 'html.parser')
+    today_table = soup.find('div', id='todaytable')
+    if not today_table:
+        return data
+    target_divs = today_table.find_all('div', style=lambda value: value and 'border:1px #000 solid' in value)
+    if not target_divs or index >= len(target_divs):
+        return data
+
+    target_div = target_divs[index]
+    tbody_tags = target_div.find_all('tr')
+
+    current_league = None
+    current_matches = []
+
+    for tbody in tbody_tags:
+        league_td = tbody.find('td', class_='utable_league')
+        if league_td:
+            if current_league:
+                data.append({
+                    'date': converter.to_utc_format(format_string(target_div.find('strong').text) if target_div.find('strong') else None),
+                    'leagues': current_league,
+                    'matches': current_matches
+                })
+            current_league = format_string(league_td.text)
+            current_matches = []
+        else:
+            match = {}
+            for class_name, key in [
+                ('utable_f1 f', 'เวลา'),
+                ('utable_f2 f', 'เจ้าบ้าน'),
+                ('utable_f3 f classodds', 'ราคาบอล'),
+                ('utable_f4 f', 'ทีมเยือน'),
+                ('utable_f7 f', 'ครึี่งแรก'),
+                ('utable_f5 f classmore', 'ผลบอล'),
+                ('utable_f6 f', 'ทรรศนะฟุตบอลวันนี้')
+            ]:
+                td = tbody.find('td', class_=class_name)
+                if td:
+                    if class_name == 'utable_f4 f':
+                        span = td.find('span')
+                        match[key] = format_string(span.text if span else td.text)
+                    else:
+                        match[key] = format_string(td.text)
+            if match:
+                current_matches.append(match)
+
+    if current_league:
+        data.append({
+            'date': converter.to_utc_format(format_string(target_div.find('strong').text) if target_div.find('strong') else None),
+            'leagues': current_league,
+            'matches': current_matches
+        })
+
+    return data
+
+class LegacyThaiDateConverter:
+    def __init__(self):
+        self.thai_months = [
+            'มกราคม', 'กุมภาพันธ์', 'มีนาคม', 'เมษายน', 'พฤษภาคม', 'มิถุนายน',
+            'กรกฎาคม', 'สิงหาคม', 'กันยายน', 'ตุลาคม', 'พฤศจิกายน', 'ธันวาคม'
+        ]
+
+    def extract_date_and_time(self, text):
+        pattern = r'(?:วัน(จันทร์|อังคาร|พุธ|พฤหัสบดี|ศุกร์|เสาร์|อาทิตย์)?(?:ที่)?)??\s*(\d{1,2})\s*(มกราคม|กุมภาพันธ์|มีนาคม|เมษายน|พฤษภาคม|มิถุนายน|กรกฎาคม|สิงหาคม|กันยายน|ตุลาคม|พฤศจิกายน|ธันวาคม)\s*(?:พ\.ศ\.)?\s*(\d{4})(?:\s*เวลา\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(น\.|นาฬิกา)?)?'
+        match = re.search(pattern, text)
+        if match:
+            return match.groups()
+        return None
+
+    def parse_thai_date_and_time(self, parts):
+        if not parts or len(parts) < 4:
+            return None
+        day = int(parts[1])
+        month = self.thai_months.index(parts[2]) + 1
+        year = int(parts[3]) - 543
+        hour = int(parts[4]) if parts[4] else 0
+        minute = int(parts[5]) if parts[5] else 0
+        second = int(parts[6]) if parts[6] else 0
+        try:
+            return datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+        except ValueError:
+            return None
+
+    def to_utc_format(self, text):
+        parts = self.extract_date_and_time(text)
+        if parts:
+            date_obj = self.parse_thai_date_and_time(parts)
+            if date_obj:
+                return date_obj.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        return None
@@ -0,0 +1,396 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from benchmarks.fakes import FakeGoalServer, FakeTelegramBot, install_mongo, reset_mongo
+from benchmarks.fixtures import SIZES, load_fixture
+from utils.match_values import typed_match_fields
+
+# Offline: fixtures are served by a local fake goal1.co, Mongo is mongomock-motor (or BENCH_MONGODB_URI)
+# and Telegram/webhook deliveries land in fakes.
+#   python -m benchmarks.suite [--sizes small,medium,large] [--only parse,save] [--json out.json]
+#                              [--baseline old.json --threshold 0.2]
+os.environ.setdefault('MATCH_STATE_BACKEND', 'memory')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '1:bench')
+os.environ.setdefault('TELEGRAM_GROUP_ID', '-100')
+
+BENCHMARKS = ('parse', 'fetch', 'save', 'notify', 'api')
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'p50_ms': statistics.median(timings) * 1000,
+        'p95_ms': timings[math.ceil(len(timings) * 0.95) - 1] * 1000,
+        'min_ms': timings[0] * 1000,
+        'mean_ms': statistics.mean(timings) * 1000,
+    }
+
+def count_matches(days):
+    return sum(len(league['matches']) for day in days for league in day)
+
+def result(benchmark, case, size, **metrics):
+    return {'benchmark': benchmark, 'case': case, 'size': size, 'metrics': metrics}
+
+@contextlib.contextmanager
+def quiet():
+    # The code under test logs with print, keep it out of the timings and the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_parse(sizes, runs):
+    from scrapper import parse_goal, parse_goal_days
+    results = []
+    for size in sizes:
+        html = load_fixture(size)
+        matches = count_matches(parse_goal_days(html))
+        for case, func in [('goal_index0', lambda: parse_goal(html, 0)), ('all_days', lambda: parse_goal_days(html))]:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+            stats = summarize(timings)
+            parsed = count_matches([func()]) if case == 'goal_index0' else matches
+            results.append(result('parse', case, size, bytes=len(html.encode('utf-8')), matches=parsed,
+                                  pages_per_s=1000 / stats['p50_ms'], matches_per_s=parsed * 1000 / stats['p50_ms'], **stats))
+    return results
+
+async def bench_fetch(server, sizes, runs):
+    import scrapper
+    from scrapper import PageChangeTracker, goal_all_async, goal_if_changed
+    from utils.async_fetcher import close_fetcher
+    scrapper.URL = server.url
+    results = []
+    for size in sizes:
+        server.set_page(load_fixture(size))
+        timings = []
+        with quiet():
+            for _ in range(runs):
+                started = time.perf_counter()
+                await goal_all_async()
+                timings.append(time.perf_counter() - started)
+        results.append(result('fetch', 'fetch_parse', size, **summarize(timings)))
+
+        tracker = PageChangeTracker()
+        with quiet():
+            await goal_if_changed(tracker)
+        tracker.commit()
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            await goal_if_changed(tracker)
+            timings.append(time.perf_counter() - started)
+        results.append(result('fetch', 'not_modified', size, **summarize(timings)))
+    await close_fetcher()
+    return results
+
+def churn(data, rng, ratio):
+    changed = 0
+    for league in data:
+        for match in league['matches']:
+            if rng.random() < ratio:
+                home, away = (int(part) if part.strip().isdigit() else 0 for part in match['ผลบอล'].split('-'))
+                match['ผลบอล'] = f"{home + 1} - {away}"
+                changed += 1
+    return changed
+
+async def bench_save(sizes, runs):
+    from goal_data_saver import GoalDataSaver
+    from scrapper import parse_goal_days
+    results = []
+    rng = random.Random(3)
+    for size in sizes:
+        await reset_mongo()
+        data = [league for day in parse_goal_days(load_fixture(size)) for league in day]
+        matches = sum(len(league['matches']) for league in data)
+        with quiet():
+            saver = GoalDataSaver()
+            await saver.setup()
+            started = time.perf_counter()
+            await saver.save_matches(data)
+            cold = time.perf_counter() - started
+        results.append(result('save', 'cold_insert', size, matches=matches, elapsed_ms=cold * 1000,
+                              ops_per_s=matches / cold))
+
+        for case, ratio in [('unchanged', 0), ('churn_10pct', 0.1)]:
+            timings = []
+            written = 0
+            for _ in range(runs):
+                written += churn(data, rng, ratio)
+                with quiet():
+                    started = time.perf_counter()
+                    await saver.save_matches(data)
+                    timings.append(time.perf_counter() - started)
+            stats = summarize(timings)
+            results.append(result('save', case, size, matches=matches, writes_per_run=written / runs,
+                                  ops_per_s=matches * 1000 / stats['p50_ms'], **stats))
+    return results
+
+async def seed_notifier_matches(collection, names, total):
+    # Dates within the last day, so both notifiers' scan queries pick every document
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    league_ids = await names.intern('league', {f"League {n % 40}" for n in range(total)})
+    team_ids = await names.intern('team', {f"{side} {n}" for n in range(total) for side in ('Home', 'Away')})
+    docs = [{
+        '_id': f"bench_{n:06d}",
+        'league_id': league_ids[f"League {n % 40}"],
+        'date': now - timedelta(minutes=n % 1000),
+        'home_team_id': team_ids[f"Home {n}"],
+        'away_team_id': team_ids[f"Away {n}"],
+        'odds': '0.5',
+        'score': '0 - 0',
+        'previous_score': '0 - 0',
+        **typed_match_fields('0 - 0', '0.5'),
+        'previous_score_home': 0,
+        'previous_score_away': 0,
+        'time': '20:00',
+        'bangkok_time': '20:00',
+        'signal': '',
+    } for n in range(total)]
+    await collection.insert_many(docs)
+    return docs
+
+async def bench_notify(server, totals, runs):
+    from goal_telegram_bot import GoalTelegramBot
+    from utils.score_events import ScoreEventBus
+    from webhook import GoalWebhook
+    os.environ['WEBHOOK_URLS'] = server.url
+    results = []
+    rng = random.Random(5)
+    for total in totals:
+        await reset_mongo()
+        with quiet():
+            webhook = GoalWebhook(notify_mode='poll')
+            bot = GoalTelegramBot(notify_mode='poll')
+        bot.delivery.bot = FakeTelegramBot()
+        collection = webhook.mongodb_client.db['matches_data']
+        docs = await seed_notifier_matches(collection, bot.names, total)
+
+        goal_round = 0
+        for name, notifier in [('webhook', webhook), ('telegram', bot)]:
+            with quiet():
+                await notifier.check_for_goals()
+            timings = []
+            notified = 0
+            for _ in range(runs):
+                # Every round writes a score no match has had yet, so each sampled match is a goal
+                goal_round += 1
+                goals = rng.sample(docs, max(1, total // 20))
+                for doc in goals:
+                    await collection.update_one({'_id': doc['_id']}, {'$set': {
+                        'score': f"{goal_round} - 0", 'score_home': goal_round,
+                        'previous_score': f"{goal_round - 1} - 0", 'previous_score_home': goal_round - 1,
+                    }})
+                before = server.webhooks if name == 'webhook' else bot.delivery.stats['queued']
+                with quiet():
+                    started = time.perf_counter()
+                    await notifier.check_for_goals()
+                    timings.append(time.perf_counter() - started)
+                notified += (server.webhooks if name == 'webhook' else bot.delivery.stats['queued']) - before
+            results.append(result('notify', f'{name}_scan', str(total), matches=total,
+                                  notified_per_run=notified / runs, **summarize(timings)))
+        await webhook.sender.close()
+
+        # Event path: publish score changes and time until the bot has queued every alert
+        bot.score_bus = ScoreEventBus(maxsize=total + 1)
+        queue = bot.score_bus.subscribe()
+        consumer = asyncio.create_task(bot.consume_score_events(queue))
+        events = [{**doc, 'score': '9 - 9', 'score_home': 9, 'score_away': 9} for doc in docs[:max(1, total // 10)]]
+        before = bot.delivery.stats['queued']
+        with quiet():
+            started = time.perf_counter()
+            for event in events:
+                bot.score_bus.publish(event)
+            while bot.delivery.stats['queued'] - before < len(events):
+                await asyncio.sleep(0)
+            elapsed = time.perf_counter() - started
+        consumer.cancel()
+        results.append(result('notify', 'telegram_events', str(total), events=len(events),
+                              elapsed_ms=elapsed * 1000, events_per_s=len(events) / elapsed))
+    return results
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def bench_api(server, sizes, concurrency, total_requests):
+    import aiohttp
+    import uvicorn
+    import scrapper
+    import web_api
+    scrapper.URL = server.url
+    results = []
+    port = free_port()
+    config = uvicorn.Config(web_api.app, host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+    api = uvicorn.Server(config)
+    thread = threading.Thread(target=api.run, daemon=True)
+    with quiet():
+        thread.start()
+        while not api.started:
+            await asyncio.sleep(0.05)
+    base = f'http://127.0.0.1:{port}'
+
+    async def load(session, path, headers=None):
+        semaphore = asyncio.Semaphore(concurrency)
+        timings, statuses = [], {}
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.get(base + path, headers=headers) as response:
+                        await response.read()
+                        status = str(response.status)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = type(e).__name__
+                statuses[status] = statuses.get(status, 0) + 1
+                timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        return {'requests': total_requests, 'concurrency': concurrency, 'requests_per_s': total_requests / elapsed,
+                'statuses': statuses, **summarize(timings)}
+
+    try:
+        # The app logs every scrape from its own thread
+        with quiet():
+            connector = aiohttp.TCPConnector(limit=concurrency)
+            timeout = aiohttp.ClientTimeout(total=30)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                for size in sizes:
+                    server.set_page(load_fixture(size))
+                    web_api.goal_cache.entries.clear()
+                    pages_before = server.page_requests
+                    # Cold: every request arrives before the first scrape finishes and shares it
+                    metrics = await load(session, '/goal')
+                    metrics['upstream_fetches'] = server.page_requests - pages_before
+                    results.append(result('api', 'goal_cold', size, **metrics))
+                    results.append(result('api', 'goal_warm', size, **await load(session, '/goal')))
+                    async with session.get(base + '/goal') as response:
+                        await response.read()
+                        etag = response.headers['ETag']
+                    results.append(result('api', 'goal_304', size, **await load(session, '/goal', {'If-None-Match': etag})))
+    finally:
+        with quiet():
+            api.should_exit = True
+            thread.join(timeout=10)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+def result_key(entry):
+    return f"{entry['benchmark']}/{entry['case']}/{entry['size']}"
+
+def compare(results, baseline_path, threshold):
+    # Only the headline metric of each result is compared: p50 latency, or a rate where there is no latency
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {result_key(entry): entry['metrics'] for entry in json.load(f)['results']}
+    regressions = []
+    for entry in results:
+        old = baseline.get(result_key(entry))
+        if not old:
+            continue
+        new = entry['metrics']
+        if 'p50_ms' in new and 'p50_ms' in old:
+            change = new['p50_ms'] / old['p50_ms'] - 1
+            metric = 'p50_ms'
+        else:
+            rate = next((key for key in new if key.endswith('_per_s') and key in old), None)
+            if rate is None:
+                continue
+            change = old[rate] / new[rate] - 1
+            metric = rate
+        flag = 'REGRESSION' if change > threshold else ''
+        print(f"{result_key(entry):<40} {metric:<16} {change * 100:+7.1f}% {flag}")
+        if flag:
+            regressions.append(result_key(entry))
+    return regressions
+
+def print_results(results):
+    for entry in results:
+        metrics = entry['metrics']
+        headline = ', '.join(
+            f"{key} {value:.1f}" for key, value in metrics.items()
+            if isinstance(value, float) and (key.endswith('_per_s') or key in ('p50_ms', 'p95_ms', 'elapsed_ms'))
+        )
+        print(f"{result_key(entry):<40} {headline}")
+
+async def run(args):
+    sizes = args.sizes.split(',')
+    only = args.only.split(',') if args.only else BENCHMARKS
+    mongo = install_mongo() if {'save', 'notify', 'api'} & set(only) else None
+    server = FakeGoalServer().start()
+    results = []
+    try:
+        if 'parse' in only:
+            results += bench_parse(sizes, args.runs)
+        if 'fetch' in only:
+            results += await bench_fetch(server, sizes, args.runs)
+        if 'save' in only:
+            results += await bench_save(sizes, args.runs)
+        if 'notify' in only:
+            results += await bench_notify(server, [int(total) for total in args.notify_matches.split(',')], args.runs)
+        if 'api' in only:
+            # Last: the app's lifespan closes the shared Mongo clients on shutdown
+            results += await bench_api(server, sizes, args.concurrency, args.requests)
+    finally:
+        server.stop()
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mongo': mongo,
+            'runs': args.runs,
+        },
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline performance suite')
+    parser.add_argument('--sizes', default=','.join(SIZES))
+    parser.add_argument('--only', help=f"comma separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--notify-matches', default='200,2000')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--json', help='write the machine-readable report here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier --json report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print_results(report['results'])
+        print(f"Wrote {args.json}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline and compare(report['results'], args.baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, timedelta
+import pytz
+from db.names import get_name_dictionary
+from utils.schedule_messages import render_league_messages
+from utils.ttl_cache import AsyncTTLCache
+
+# home_team/away_team only exist on rows migrate_match_keys has not moved to interned ids yet
+SCHEDULE_MATCH_FIELDS = ('home_team_id', 'away_team_id', 'home_team', 'away_team', 'score', 'odds', 'signal', 'bangkok_time', 'date')
+
+def schedule_day(now=None):
+    return (now or datetime.now(pytz.timezone('Asia/Bangkok'))).strftime('%Y-%m-%d')
+
+def build_daily_schedule_pipeline(day):
+    # matches_data.date is Bangkok wall-clock time, so a Bangkok day is a plain [00:00, 24:00) range
+    since = datetime.strptime(day, '%Y-%m-%d')
+    return [
+        {'$match': {'date': {'$gte': since, '$lt': since + timedelta(days=1)}}},
+        {'$sort': {'date': 1, '_id': 1}},
+        {'$group': {
+            # Unmigrated rows carry the league name instead of an id
+            '_id': {'league_id': '$league_id', 'league': '$league'},
+            'matches': {'$push': {field: f'${field}' for field in SCHEDULE_MATCH_FIELDS}},
+        }},
+    ]
+
+async def load_daily_schedule(collection, names, day):
+    groups = await collection.aggregate(build_daily_schedule_pipeline(day)).to_list(length=None)
+    for group in groups:
+        group['league_id'] = group['_id'].get('league_id')
+        group['league'] = group['_id'].get('league')
+    await names.expand(groups + [match for group in groups for match in group['matches']])
+    by_league = {}
+    for group in groups:
+        if not group['league']:
+            print(f"Skipping {len(group['matches'])} scheduled matches without a league on {day}")
+            continue
+        # Migrated and legacy rows of one league end up in separate groups while the migration is pending
+        by_league.setdefault(group['league'], []).extend(group['matches'])
+    leagues = []
+    # Sorted here rather than in the pipeline, only the dictionary knows the league names
+    for league in sorted(by_league):
+        matches = sorted(by_league[league], key=lambda match: match['date'])
+        leagues.append({
+            'league': league,
+            'matches': matches,
+            'messages': render_league_messages(league, matches),
+        })
+    return {'date': day, 'leagues': leagues}
+
+_schedule_cache = None
+
+def get_schedule_cache(mongodb_client):
+    # One cache per process, shared by the Telegram bot and the web API
+    global _schedule_cache
+    if _schedule_cache is None:
+        collection, names = mongodb_client.db['matches_data'], get_name_dictionary(mongodb_client)
+        _schedule_cache = AsyncTTLCache(
+            lambda day: load_daily_schedule(collection, names, day),
+            ttl=float(os.getenv('SCHEDULE_CACHE_TTL', 300)),
+            stale_ttl=float(os.getenv('SCHEDULE_CACHE_STALE_TTL', 600)),
+            # Any ?date= is a key, the least recently asked days are evicted
+            max_entries=int(os.getenv('SCHEDULE_CACHE_MAX_DAYS', 14)),
+        )
+    return _schedule_cache
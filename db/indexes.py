@@ -0,0 +1,18 @@
+from pymongo import ASCENDING, IndexModel
+
+# Every index ends with (date, _id) so the keyset pagination in db.match_queries stays an index scan
+MATCH_INDEXES = [
+    IndexModel([('date', ASCENDING), ('_id', ASCENDING)], name='date_id'),
+    IndexModel([('league_id', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)], name='league_id_date_id'),
+    IndexModel([('home_team_id', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)], name='home_team_id_date_id'),
+    IndexModel([('away_team_id', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)], name='away_team_id_date_id'),
+    IndexModel([('score_home', ASCENDING), ('score_away', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)], name='score_date_id'),
+    IndexModel([('odds_line', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)], name='odds_line_date_id'),
+]
+
+# Indexes on the name fields matches_data stored before team/league interning, and the original
+# unique (_id, date, league) index, which _id alone already makes unique
+LEGACY_MATCH_INDEXES = ('league_date_id', 'home_team_date_id', 'away_team_date_id', '_id_1_date_1_league_1')
+
+async def ensure_match_indexes(collection):
+    return await collection.create_indexes(MATCH_INDEXES)
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+DEFAULT_TTL = 10
+
+class MongoLease:
+    # Leader election on a lease document: {_id: name, owner, term, expires_at}. The holder renews
+    # every renew_interval; anyone may take the lease once expires_at has passed, so a dead leader
+    # is replaced within ttl seconds. Expiry is compared with the local clock, nodes are assumed to
+    # be NTP synced to well within the ttl.
+    def __init__(self, collection, name, owner=None, ttl=DEFAULT_TTL, renew_interval=None):
+        self.collection = collection
+        self.name = name
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self.is_leader = False
+        # Grows every time the lease changes hands. Only logged: writers do not check it, so stepping
+        # down before valid_until (see keep_alive) is what keeps two leaders from overlapping.
+        self.term = None
+        self.valid_until = 0.0
+        self.changed = None
+
+    async def try_acquire(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        started = time.monotonic()
+        try:
+            doc = await self.collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                [{'$set': {
+                    'term': {'$cond': [
+                        {'$eq': ['$owner', self.owner]},
+                        '$term',
+                        {'$add': [{'$ifNull': ['$term', 0]}, 1]},
+                    ]},
+                    'acquired_at': {'$cond': [{'$eq': ['$owner', self.owner]}, '$acquired_at', now]},
+                    'owner': self.owner,
+                    'expires_at': now + timedelta(seconds=self.ttl),
+                    'renewed_at': now,
+                }}],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The filter missed an existing, live lease and the upsert collided with it
+            return False
+        self.term = doc.get('term')
+        # Counted from before the round trip, so a slow reply shortens our own view of the lease
+        self.valid_until = started + self.ttl
+        return True
+
+    async def release(self):
+        if not self.is_leader:
+            return
+        self._set_leader(False)
+        try:
+            # Handing over right away instead of letting the lease run out
+            await self.collection.delete_one({'_id': self.name, 'owner': self.owner})
+        except Exception as e:
+            print(f"Error releasing lease {self.name}: {str(e)}")
+
+    def _set_leader(self, leader):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        print(f"Lease {self.name}: {self.owner} {'acquired leadership (term ' + str(self.term) + ')' if leader else 'lost leadership'}")
+        if self.changed is not None:
+            self.changed.set()
+
+    async def keep_alive(self):
+        while True:
+            try:
+                if self.is_leader:
+                    # A renewal blocked on server selection must not run past the lease it is renewing
+                    acquired = await asyncio.wait_for(self.try_acquire(), max(0.0, self.valid_until - time.monotonic()))
+                else:
+                    acquired = await self.try_acquire()
+                self._set_leader(acquired)
+            except asyncio.TimeoutError:
+                print(f"Renewing lease {self.name} timed out, stepping down")
+                self._set_leader(False)
+            except Exception as e:
+                print(f"Error renewing lease {self.name}: {str(e)}")
+            if self.is_leader and time.monotonic() >= self.valid_until:
+                # Could not renew in time, another node may already hold the lease
+                self._set_leader(False)
+            await asyncio.sleep(self.renew_interval)
+
+    async def wait_changed(self):
+        # Created lazily so it binds to the running loop
+        self.changed = self.changed or asyncio.Event()
+        await self.changed.wait()
+        self.changed.clear()
+
+async def run_as_leader(lease, work):
+    # Runs work() only while this instance holds the lease: started on election, cancelled on loss
+    lease.changed = lease.changed or asyncio.Event()
+    keeper = asyncio.create_task(lease.keep_alive())
+    task = None
+    try:
+        while True:
+            if lease.is_leader and task is None:
+                task = asyncio.create_task(work())
+            elif not lease.is_leader and task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                task = None
+            if task is not None and task.done():
+                # work() ended on its own (or crashed): surface it and hand the lease over
+                await task
+                return
+            waiter = asyncio.create_task(lease.wait_changed())
+            await asyncio.wait([waiter] + ([task] if task else []), return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+    finally:
+        keeper.cancel()
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await lease.release()
+
+def create_lease(mongodb_client, name):
+    return MongoLease(
+        mongodb_client.db['leases'],
+        name,
+        ttl=float(os.getenv('LEADER_LEASE_TTL', DEFAULT_TTL)),
+    )
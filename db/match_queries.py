@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from db.names import NAME_FIELDS
+
+MAX_LIMIT = 500
+
+# Fields a client may ask for through ?fields=
+MATCH_FIELDS = (
+    'league', 'date', 'home_team', 'away_team', 'odds', 'score', 'previous_score', 'time',
+    'bangkok_time', 'league_order', 'match_order', 'signal', 'created_at', 'updated_at',
+    'score_home', 'score_away', 'previous_score_home', 'previous_score_away', 'odds_line',
+)
+
+def encode_cursor(doc):
+    raw = json.dumps({'d': doc['date'].isoformat(), 'i': doc['_id']})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(raw['d']), raw['i']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def build_projection(fields):
+    if not fields:
+        return None
+    unknown = [field for field in fields if field not in MATCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # date and _id are always returned, the next cursor is built from them.
+    # Names are stored as ids and filled back in after the query.
+    projection = {NAME_FIELDS.get(field, field): 1 for field in fields}
+    projection['date'] = 1
+    return projection
+
+def build_match_query(date_from=None, date_to=None, league_id=None, team_id=None, cursor=None,
+                      score_home=None, score_away=None, odds_min=None, odds_max=None):
+    clauses = []
+    date_range = {}
+    if date_from:
+        date_range['$gte'] = date_from
+    if date_to:
+        date_range['$lt'] = date_to
+    if date_range:
+        clauses.append({'date': date_range})
+    if league_id is not None:
+        clauses.append({'league_id': league_id})
+    if team_id is not None:
+        clauses.append({'$or': [{'home_team_id': team_id}, {'away_team_id': team_id}]})
+    if score_home is not None:
+        clauses.append({'score_home': score_home})
+    if score_away is not None:
+        clauses.append({'score_away': score_away})
+    odds_range = {}
+    if odds_min is not None:
+        odds_range['$gte'] = odds_min
+    if odds_max is not None:
+        odds_range['$lte'] = odds_max
+    if odds_range:
+        clauses.append({'odds_line': odds_range})
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        clauses.append({'$or': [
+            {'date': {'$gt': last_date}},
+            {'date': last_date, '_id': {'$gt': last_id}},
+        ]})
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {'$and': clauses}
+
+async def find_matches(collection, names, date_from=None, date_to=None, league=None, team=None,
+                       cursor=None, limit=50, fields=None, score_home=None, score_away=None,
+                       odds_min=None, odds_max=None):
+    limit = max(1, min(limit, MAX_LIMIT))
+    league_id = await names.lookup('league', league) if league else None
+    team_id = await names.lookup('team', team) if team else None
+    if (league and league_id is None) or (team and team_id is None):
+        build_projection(fields)
+        return {'items': [], 'next_cursor': None}
+    query = build_match_query(date_from, date_to, league_id, team_id, cursor,
+                              score_home, score_away, odds_min, odds_max)
+    # One extra document tells us whether there is a next page
+    docs = await collection.find(query, build_projection(fields)) \
+        .sort([('date', 1), ('_id', 1)]) \
+        .limit(limit + 1) \
+        .to_list(length=None)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {'items': await names.expand(docs[:limit]), 'next_cursor': next_cursor}
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+# Fields written by GoalDataSaver.save_matches that are compared between cycles
+TRACKED_FIELDS = (
+    'league_id', 'date', 'home_team_id', 'away_team_id', 'odds', 'score', 'time',
+    'bangkok_time', 'league_order', 'match_order', 'signal', 'score_home', 'score_away', 'odds_line',
+)
+
+def normalize(value):
+    # Mongo hands back naive UTC datetimes truncated to milliseconds
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+class MatchSnapshot:
+    def __init__(self):
+        self.state = {}
+        self.pending = {}
+        self.avoided_ops = 0
+
+    async def warm(self, collection, since):
+        projection = {field: 1 for field in TRACKED_FIELDS}
+        async for doc in collection.find({'date': {'$gte': since}}, projection):
+            self.state[doc['_id']] = {field: normalize(doc.get(field)) for field in TRACKED_FIELDS}
+        return len(self.state)
+
+    def diff(self, match_id, fields):
+        # Returns None for a match we have never persisted, otherwise the changed fields only
+        current = {field: normalize(fields.get(field)) for field in TRACKED_FIELDS}
+        self.pending[match_id] = current
+        previous = self.state.get(match_id)
+        if previous is None:
+            return None
+        return {field: fields[field] for field in TRACKED_FIELDS if current[field] != previous.get(field)}
+
+    def commit(self):
+        self.state.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+    def prune(self, before):
+        before = normalize(before)
+        stale = [match_id for match_id, fields in self.state.items() if fields['date'] and fields['date'] < before]
+        for match_id in stale:
+            del self.state[match_id]
+        return len(stale)
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from utils.metrics import BULK_WRITE_OPS, BULK_WRITE_SECONDS
+
+# Fields whose changes are recorded in the timeline
+TIMELINE_FIELDS = ('score', 'odds')
+
+# Bucket pattern: one document per match per hour holding that hour's events,
+# so a match timeline is a handful of documents read from one index range
+TIMELINE_INDEXES = [
+    IndexModel([('match_id', ASCENDING), ('bucket', ASCENDING)], name='match_id_bucket'),
+]
+
+def utc_now():
+    # Timeline times are real UTC (stored naive, as Mongo returns them),
+    # unlike the +7h shifted created_at/updated_at in matches_data
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def naive_utc(at):
+    return at.astimezone(timezone.utc).replace(tzinfo=None) if at.tzinfo else at
+
+def bucket_start(at):
+    return at.replace(minute=0, second=0, microsecond=0)
+
+def build_timeline_event(fields, at):
+    # Only the timeline fields that changed are stored on an event, a new match records all of them
+    values = {key: fields[key] for key in TIMELINE_FIELDS if key in fields}
+    if not values:
+        return None
+    return {'t': at, **values}
+
+def build_timeline_append(match_id, event):
+    bucket = bucket_start(event['t'])
+    return UpdateOne(
+        {'_id': f"{match_id}|{bucket.strftime('%Y%m%d%H')}"},
+        {
+            '$setOnInsert': {'match_id': match_id, 'bucket': bucket},
+            '$push': {'events': event},
+            '$inc': {'count': 1},
+            '$min': {'first': event['t']},
+            '$max': {'last': event['t']},
+        },
+        upsert=True,
+    )
+
+async def ensure_timeline_indexes(collection):
+    return await collection.create_indexes(TIMELINE_INDEXES)
+
+async def append_timeline(collection, events):
+    # events: (match_id, event) pairs, written in one unordered round trip
+    if not events:
+        return 0
+    with BULK_WRITE_SECONDS.time(collection=collection.name):
+        await collection.bulk_write([build_timeline_append(match_id, event) for match_id, event in events], ordered=False)
+    BULK_WRITE_OPS.inc(len(events), collection=collection.name)
+    return len(events)
+
+async def get_timeline(collection, match_id, since=None, until=None):
+    since = naive_utc(since) if since else None
+    until = naive_utc(until) if until else None
+    query = {'match_id': match_id}
+    bucket_range = {}
+    if since:
+        bucket_range['$gte'] = bucket_start(since)
+    if until:
+        bucket_range['$lte'] = until
+    if bucket_range:
+        query['bucket'] = bucket_range
+    events = []
+    async for doc in collection.find(query, {'events': 1}).sort('bucket', ASCENDING):
+        for event in doc['events']:
+            if (since and event['t'] < since) or (until and event['t'] > until):
+                continue
+            events.append(event)
+    events.sort(key=lambda event: event['t'])
+    return events
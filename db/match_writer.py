@@ -0,0 +1,52 @@
+import time
+from pymongo import UpdateOne
+from utils.metrics import BULK_WRITE_OPS, BULK_WRITE_SECONDS
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Copied to their previous_* field when the score changes, with the value a new match starts from
+PREVIOUS_FIELDS = {'score': '0 - 0', 'score_home': 0, 'score_away': 0}
+
+def literal(value):
+    # Values in an update pipeline are expressions, so '$...' strings must not be read as field paths
+    return {'$literal': value}
+
+def build_match_upsert(match_id, set_fields, insert_fields):
+    stages = []
+    if 'score' in set_fields:
+        # Copy the stored score into previous_score in the same op, before it is overwritten.
+        # The typed halves follow the raw score, so they always describe the same previous result.
+        new_score = literal(set_fields['score'])
+        score_changed = {'$ne': [{'$ifNull': ['$score', new_score]}, new_score]}
+        stages.append({'$set': {f'previous_{field}': {'$cond': [
+            score_changed,
+            f'${field}',
+            {'$ifNull': [f'$previous_{field}', initial]},
+        ]} for field, initial in PREVIOUS_FIELDS.items()}})
+    stages.append({'$set': {key: literal(value) for key, value in set_fields.items()}})
+    if insert_fields:
+        # Pipelines have no $setOnInsert, these fields only get a value when they are missing
+        stages.append({'$set': {key: {'$ifNull': [f'${key}', literal(value)]} for key, value in insert_fields.items()}})
+    return UpdateOne({'_id': match_id}, stages, upsert=True)
+
+async def write_matches(collection, operations, batch_size=DEFAULT_BATCH_SIZE):
+    stats = {
+        'ops': len(operations),
+        'batches': 0,
+        'inserted': 0,
+        'matched': 0,
+        'modified': 0,
+        'elapsed': 0.0,
+    }
+    started = time.perf_counter()
+    for i in range(0, len(operations), batch_size):
+        batch = operations[i:i + batch_size]
+        with BULK_WRITE_SECONDS.time(collection=collection.name):
+            result = await collection.bulk_write(batch, ordered=False)
+        BULK_WRITE_OPS.inc(len(batch), collection=collection.name)
+        stats['batches'] += 1
+        stats['inserted'] += result.upserted_count
+        stats['matched'] += result.matched_count
+        stats['modified'] += result.modified_count
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
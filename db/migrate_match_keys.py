@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import OperationFailure
+from db.indexes import LEGACY_MATCH_INDEXES, ensure_match_indexes
+from db.mongo import get_async_mongo
+from db.names import NAME_FIELDS, NAME_KINDS, get_name_dictionary, match_key, normalize_name
+from utils.match_values import parse_score, typed_match_fields
+
+# Documents written before interning still carry the names and a page-position _id
+LEGACY_QUERY = {'home_team': {'$exists': True}}
+
+# Known collision: the new key is kick-off day + home id + away id, so two legacy documents of
+# the same teams on one Bangkok day (a replayed fixture, or one listed under two leagues) are
+# folded into a single match here, the most recently updated one kept. GoalDataSaver applies the
+# same rule going forward: a second row with a key already seen in one save pass is skipped.
+
+load_dotenv()
+
+def merge_legacy(docs, ids):
+    # Every legacy document of one match collapses into one, the most recently updated wins
+    merged = {}
+    renamed = {}
+    for doc in sorted(docs, key=lambda doc: doc.get('updated_at') or doc.get('created_at') or doc['date']):
+        new_doc = {key: value for key, value in doc.items() if key != '_id' and key not in NAME_FIELDS}
+        # Legacy documents predate the typed fields as well
+        new_doc.update(typed_match_fields(doc.get('score'), doc.get('odds')))
+        new_doc['previous_score_home'], new_doc['previous_score_away'] = parse_score(doc.get('previous_score'))
+        for name_field, id_field in NAME_FIELDS.items():
+            new_doc[id_field] = ids[NAME_KINDS[name_field]][doc[name_field]]
+        new_id = match_key(doc['date'], new_doc['home_team_id'], new_doc['away_team_id'])
+        renamed[doc['_id']] = new_id
+        if new_id in merged:
+            if merged[new_id]['league_id'] != new_doc['league_id']:
+                print(f"Match key collision {new_id}: legacy {doc['_id']} merged across leagues")
+            created = [value for value in (merged[new_id].get('created_at'), doc.get('created_at')) if value]
+            if created:
+                new_doc['created_at'] = min(created)
+        merged[new_id] = new_doc
+    return merged, renamed
+
+def build_bucket_move(new_id, bucket):
+    # Same shape as db.match_timeline.build_timeline_append, for a whole bucket of events
+    return UpdateOne(
+        {'_id': f"{new_id}|{bucket['bucket'].strftime('%Y%m%d%H')}"},
+        {
+            '$setOnInsert': {'match_id': new_id, 'bucket': bucket['bucket']},
+            '$push': {'events': {'$each': bucket['events']}},
+            '$inc': {'count': bucket.get('count', len(bucket['events']))},
+            '$min': {'first': bucket['first']},
+            '$max': {'last': bucket['last']},
+        },
+        upsert=True,
+    )
+
+async def migrate_day(db, names, docs, stats, dry_run=False):
+    ids = {}
+    for kind in set(NAME_KINDS.values()):
+        found = {doc[field] for doc in docs for field, field_kind in NAME_KINDS.items() if field_kind == kind}
+        if dry_run:
+            # Keys from the normalized names, nothing is interned
+            ids[kind] = {name: normalize_name(name) for name in found}
+        else:
+            ids[kind] = await names.intern(kind, found)
+    merged, renamed = merge_legacy(docs, ids)
+    stats['documents'] += len(docs)
+    stats['matches'] += len(merged)
+    if dry_run:
+        return
+    moved = [old_id for old_id, new_id in renamed.items() if old_id != new_id]
+    # Insert-only: a document the new saver already wrote is newer than anything legacy
+    await db['matches_data'].bulk_write(
+        [UpdateOne({'_id': new_id}, {'$setOnInsert': doc}, upsert=True) for new_id, doc in merged.items()]
+        + [DeleteMany({'_id': {'$in': moved}})],
+        ordered=True,
+    )
+    buckets = await db['match_timeline'].find({'match_id': {'$in': moved}}).to_list(length=None)
+    if buckets:
+        await db['match_timeline'].bulk_write(
+            [build_bucket_move(renamed[bucket['match_id']], bucket) for bucket in buckets]
+            + [DeleteMany({'_id': {'$in': [bucket['_id'] for bucket in buckets]}})],
+            ordered=True,
+        )
+        stats['timeline_buckets'] += len(buckets)
+
+async def migrate_match_keys(db, names, dry_run=False):
+    # Legacy documents of one match share its kickoff day, so the collection is migrated a day at a time
+    stats = {'documents': 0, 'matches': 0, 'timeline_buckets': 0}
+    day, docs = None, []
+    async for doc in db['matches_data'].find(LEGACY_QUERY).sort('date', 1):
+        if docs and doc['date'].date() != day:
+            await migrate_day(db, names, docs, stats, dry_run)
+            docs = []
+        day = doc['date'].date()
+        docs.append(doc)
+    if docs:
+        await migrate_day(db, names, docs, stats, dry_run)
+    if not dry_run:
+        for index in LEGACY_MATCH_INDEXES:
+            try:
+                await db['matches_data'].drop_index(index)
+            except OperationFailure:
+                pass
+        await ensure_match_indexes(db['matches_data'])
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description='Move matches_data to stable match keys and interned team/league ids')
+    parser.add_argument('--dry-run', action='store_true', help='only count what would be migrated')
+    args = parser.parse_args()
+    mongodb_client = get_async_mongo(os.getenv('MONGODB_URI'), os.getenv('MONGODB_DB_NAME'))
+    names = get_name_dictionary(mongodb_client)
+    if not args.dry_run:
+        await names.ensure_indexes()
+    print(f"Loaded {await names.load()} team and league names")
+    stats = await migrate_match_keys(mongodb_client.db, names, dry_run=args.dry_run)
+    print(f"{'Would migrate' if args.dry_run else 'Migrated'} {stats['documents']} documents into {stats['matches']} matches, "
+          f"{stats['timeline_buckets']} timeline buckets moved")
+
+if __name__ == "__main__":
+    asyncio.run(main())
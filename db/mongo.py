@@ -1,4 +1,6 @@
+import os
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 
 class MongoDB:
     def __init__(self, uri, db_name):
@@ -24,3 +26,59 @@ class MongoDB:
         collection = self.db[collection_name]
         result = collection.delete_many(query)
         return result.deleted_count
+
+
+class AsyncMongoDB:
+    def __init__(self, uri, db_name, **client_options):
+        self.client = AsyncIOMotorClient(uri, **client_options)
+        self.db = self.client[db_name]
+
+    async def create(self, collection_name, data):
+        collection = self.db[collection_name]
+        result = await collection.insert_one(data)
+        return result.inserted_id
+
+    async def read(self, collection_name, query, projection=None, sort=None, limit=0):
+        collection = self.db[collection_name]
+        cursor = collection.find(query, projection, sort=sort, limit=limit)
+        return await cursor.to_list(length=None)
+
+    async def update(self, collection_name, query, data):
+        collection = self.db[collection_name]
+        result = await collection.update_many(query, {"$set": data})
+        return result.modified_count
+
+    async def delete(self, collection_name, query):
+        collection = self.db[collection_name]
+        result = await collection.delete_many(query)
+        return result.deleted_count
+
+    async def bulk_write(self, collection_name, operations, ordered=False):
+        collection = self.db[collection_name]
+        return await collection.bulk_write(operations, ordered=ordered)
+
+    async def stream(self, collection_name, query, projection=None, sort=None, batch_size=500):
+        # Documents are yielded batch by batch instead of materialising the whole result
+        collection = self.db[collection_name]
+        cursor = collection.find(query, projection, sort=sort, batch_size=batch_size)
+        async for doc in cursor:
+            yield doc
+
+    def close(self):
+        self.client.close()
+
+_async_clients = {}
+
+def get_async_mongo(uri=None, db_name=None):
+    # One pooled Motor client per process, shared by every component that asks for the same database
+    uri = uri or os.getenv('MONGODB_URI')
+    db_name = db_name or os.getenv('MONGODB_DB_NAME')
+    key = (uri, db_name)
+    if key not in _async_clients:
+        _async_clients[key] = AsyncMongoDB(uri, db_name, maxPoolSize=int(os.getenv('MONGODB_MAX_POOL_SIZE', 50)))
+    return _async_clients[key]
+
+def close_async_mongo():
+    for client in _async_clients.values():
+        client.close()
+    _async_clients.clear()
@@ -0,0 +1,107 @@
+import unicodedata
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+
+# matches_data keeps the small integer ids, the names live once in the names collection
+NAME_FIELDS = {'league': 'league_id', 'home_team': 'home_team_id', 'away_team': 'away_team_id'}
+NAME_KINDS = {'league': 'league', 'home_team': 'team', 'away_team': 'team'}
+
+NAME_INDEXES = [
+    IndexModel([('kind', ASCENDING), ('key', ASCENDING)], name='kind_key', unique=True),
+]
+
+def normalize_name(name):
+    # Case, width, punctuation and spacing differences on the page map to the same key
+    name = unicodedata.normalize('NFKC', str(name)).casefold()
+    name = ''.join(' ' if unicodedata.category(char)[0] in 'PSZ' else char for char in name)
+    return ' '.join(name.split())
+
+def match_key(kickoff, home_team_id, away_team_id):
+    # Same teams on the same Bangkok day is the same match, wherever it sits on the page
+    return f"{kickoff:%Y%m%d}_{home_team_id}_{away_team_id}"
+
+class NameDictionary:
+    # Interns league and team names as sequential ints. The dictionary only grows and is small
+    # (a few thousand names), so every id seen is cached for the life of the process.
+    def __init__(self, collection, counters):
+        self.collection = collection
+        self.counters = counters
+        self.ids = {}
+        self.names = {}
+        self.index_ready = False
+
+    def _remember(self, doc):
+        self.ids[(doc['kind'], doc['key'])] = doc['_id']
+        self.names[doc['_id']] = doc['name']
+
+    async def ensure_indexes(self):
+        await self.collection.create_indexes(NAME_INDEXES)
+        self.index_ready = True
+
+    async def load(self):
+        async for doc in self.collection.find({}):
+            self._remember(doc)
+        return len(self.names)
+
+    async def intern(self, kind, names):
+        # Returns {name: id} for every name, creating the missing ones in one insert
+        keys = {name: normalize_name(name) for name in names}
+        missing = {key: name for name, key in keys.items() if (kind, key) not in self.ids}
+        if missing:
+            if not self.index_ready:
+                await self.ensure_indexes()
+            async for doc in self.collection.find({'kind': kind, 'key': {'$in': list(missing)}}):
+                self._remember(doc)
+                missing.pop(doc['key'], None)
+        if missing:
+            counter = await self.counters.find_one_and_update(
+                {'_id': 'names'}, {'$inc': {'seq': len(missing)}}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            first = counter['seq'] - len(missing) + 1
+            docs = [{'_id': first + i, 'kind': kind, 'key': key, 'name': name} for i, (key, name) in enumerate(missing.items())]
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                if any(error['code'] != DUPLICATE_KEY for error in e.details.get('writeErrors', [])):
+                    raise
+                # Another process interned some of these first, its ids win
+                async for doc in self.collection.find({'kind': kind, 'key': {'$in': list(missing)}}):
+                    self._remember(doc)
+            for doc in docs:
+                if (kind, doc['key']) not in self.ids:
+                    self._remember(doc)
+        return {name: self.ids[(kind, key)] for name, key in keys.items()}
+
+    async def lookup(self, kind, name):
+        # Read-only: an unknown name has no id and matches nothing
+        key = normalize_name(name)
+        if (kind, key) not in self.ids:
+            doc = await self.collection.find_one({'kind': kind, 'key': key})
+            if doc is None:
+                return None
+            self._remember(doc)
+        return self.ids[(kind, key)]
+
+    async def expand(self, docs):
+        # Fills league/home_team/away_team back in from the stored ids, in place
+        missing = {doc[field] for doc in docs for field in NAME_FIELDS.values()
+                   if doc.get(field) is not None and doc[field] not in self.names}
+        if missing:
+            async for doc in self.collection.find({'_id': {'$in': list(missing)}}):
+                self._remember(doc)
+        for doc in docs:
+            for name_field, id_field in NAME_FIELDS.items():
+                if doc.get(id_field) is not None:
+                    doc[name_field] = self.names.get(doc[id_field], '')
+        return docs
+
+_dictionary = None
+
+def get_name_dictionary(mongodb_client):
+    # One per process so the saver, notifiers and API share the cache
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = NameDictionary(mongodb_client.db['names'], mongodb_client.db['counters'])
+    return _dictionary
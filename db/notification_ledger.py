@@ -0,0 +1,236 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import BulkWriteError, PyMongoError
+
+DUPLICATE_KEY = 11000
+# A claim that was never marked sent (crash, dropped delivery) may be taken again after this long
+DEFAULT_CLAIM_TIMEOUT = 10 * 60
+DEFAULT_RETENTION_DAYS = 30
+# Stale claims are re-sent at most this many times in all, then given up as failed
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_SWEEP_INTERVAL = 60
+CLAIM_RETRY_DELAY = 5
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class NotificationLedger:
+    # One document per (channel, match _id, score). The _id is built from that triple, so the
+    # unique _id index makes the insert an atomic claim: only one instance can announce a goal.
+    def __init__(self, collection, channel, claim_timeout=DEFAULT_CLAIM_TIMEOUT, retention_days=DEFAULT_RETENTION_DAYS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.collection = collection
+        self.channel = channel
+        self.claim_timeout = claim_timeout
+        self.retention_days = retention_days
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.index_ready = False
+
+    def key(self, match):
+        return f"{self.channel}|{match['_id']}|{match['score']}"
+
+    async def ensure_indexes(self):
+        # Old entries are only an audit trail, Mongo drops them after retention_days
+        expire = int(self.retention_days * 86400)
+        ttl = (await self.collection.index_information()).get('claimed_at_1')
+        if ttl is not None and ttl.get('expireAfterSeconds') != expire:
+            # create_index with a new retention raises IndexOptionsConflict, the TTL is changed in place
+            await self.collection.database.command(
+                'collMod', self.collection.name, index={'keyPattern': {'claimed_at': 1}, 'expireAfterSeconds': expire})
+        else:
+            await self.collection.create_index('claimed_at', expireAfterSeconds=expire)
+        # The stale claim sweep
+        await self.collection.create_index([('status', 1), ('claimed_at', 1)])
+        self.index_ready = True
+
+    async def claim(self, matches):
+        # One insert_many per batch; returns the matches this caller won and now has to send
+        if not matches:
+            return []
+        if not self.index_ready:
+            await self.ensure_indexes()
+        now = utc_now()
+        docs = {}
+        for match in matches:
+            docs.setdefault(self.key(match), {
+                '_id': self.key(match),
+                'channel': self.channel,
+                'match_id': match['_id'],
+                'score': match['score'],
+                'status': 'claimed',
+                'owner': self.owner,
+                'claimed_at': now,
+                'attempts': 1,
+            })
+        batch = list(docs.values())
+        taken = set()
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error['code'] != DUPLICATE_KEY for error in errors):
+                raise
+            taken = {batch[error['index']]['_id'] for error in errors}
+        if taken:
+            taken -= {doc['_id'] for doc in await self._reclaim_stale({'_id': {'$in': list(taken)}}, now)}
+        claimed = []
+        for match in matches:
+            # A match listed twice in the batch is still only sent once
+            if self.key(match) not in taken:
+                taken.add(self.key(match))
+                claimed.append(match)
+        return claimed
+
+    async def _reclaim_stale(self, query, now):
+        # Returns the ledger entries matching `query` whose stale claim this instance took over
+        cutoff = now - timedelta(seconds=self.claim_timeout)
+        reclaimed = []
+        stale = self.collection.find(dict(query, status='claimed', claimed_at={'$lt': cutoff}))
+        async for doc in stale:
+            # Conditional on the same state, so two instances cannot both take over one stale claim
+            result = await self.collection.update_one(
+                {'_id': doc['_id'], 'status': 'claimed', 'claimed_at': {'$lt': cutoff}},
+                {'$set': {'owner': self.owner, 'claimed_at': now}, '$inc': {'attempts': 1}},
+            )
+            if result.modified_count:
+                reclaimed.append(doc)
+        return reclaimed
+
+    async def sweep_stale(self):
+        # Claims whose sender died or whose delivery was dropped are never claimed again by a new
+        # event, since the score does not change back. The notifiers sweep them and send them again.
+        if not self.index_ready:
+            await self.ensure_indexes()
+        now = utc_now()
+        await self.collection.update_many(
+            {'channel': self.channel, 'status': 'claimed', 'attempts': {'$gte': self.max_attempts},
+             'claimed_at': {'$lt': now - timedelta(seconds=self.claim_timeout)}},
+            {'$set': {'status': 'failed'}},
+        )
+        return await self._reclaim_stale({'channel': self.channel}, now)
+
+    async def mark_sent(self, keys):
+        if keys:
+            await self.collection.update_many({'_id': {'$in': list(keys)}}, {'$set': {'status': 'sent', 'sent_at': utc_now()}})
+
+    async def mark_delivered(self, key, targets):
+        # Partial fan-out: the targets reached so far, a resend of this claim skips them
+        if targets:
+            await self.collection.update_one({'_id': key}, {'$addToSet': {'delivered': {'$each': list(targets)}}})
+
+    async def mark_superseded(self, keys):
+        # A swept claim whose match has scored again since, the newer score has its own claim
+        if keys:
+            await self.collection.update_many({'_id': {'$in': list(keys)}, 'status': 'claimed'}, {'$set': {'status': 'superseded'}})
+
+def create_notification_ledger(mongodb_client, channel):
+    return NotificationLedger(
+        mongodb_client.db['notification_ledger'],
+        channel,
+        claim_timeout=float(os.getenv('NOTIFY_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)),
+        retention_days=float(os.getenv('NOTIFY_LEDGER_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)),
+        max_attempts=int(os.getenv('NOTIFY_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+    )
+
+
+class GoalClaims:
+    # The claim, retry, resend and sweep flow shared by the goal notifiers. A notifier supplies
+    # send(match, delivered): deliver one claimed goal to every target not in `delivered`, then
+    # mark it sent and record its score in last_scores. Until then a claim is swept and sent again.
+    def __init__(self, ledger, matches, names, last_scores, send, fields=None, background=False,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL, claim_retry_delay=CLAIM_RETRY_DELAY):
+        self.ledger = ledger
+        self.matches = matches
+        self.names = names
+        self.last_scores = last_scores
+        self.send = send
+        # Projection for the matches a resend loads, None reads whole documents
+        self.fields = fields
+        # Event sends run as tasks, so retries of one alert do not hold up the next event
+        self.background = background
+        self.sweep_interval = sweep_interval
+        self.claim_retry_delay = claim_retry_delay
+        self.pending = set()
+
+    async def claim(self, goals):
+        # Returns the goals this instance won, names filled in. Goals claimed elsewhere are in the
+        # ledger already, its owner or the sweep delivers them, so they count as seen here.
+        claimed = await self.names.expand(await self.ledger.claim(goals))
+        claimed_keys = {self.ledger.key(match) for match in claimed}
+        for match in goals:
+            if self.ledger.key(match) not in claimed_keys:
+                self.last_scores.set(match['_id'], match['score'])
+        return claimed
+
+    async def dispatch(self, matches, delivered=None, background=False):
+        sends = [self.send(match, done) for match, done in zip(matches, delivered or [()] * len(matches))]
+        if not background:
+            await asyncio.gather(*sends)
+            return
+        for send in sends:
+            task = asyncio.create_task(send)
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def consume(self, queue):
+        retry = []
+        while True:
+            # Whatever piled up while the last batch was claimed is claimed together
+            if retry:
+                await asyncio.sleep(self.claim_retry_delay)
+                events = retry
+            else:
+                events = [await queue.get()]
+            while not queue.empty():
+                events.append(queue.get_nowait())
+            goals = [match for match in events if self.last_scores.get(match['_id']) != match['score']]
+            try:
+                claimed = await self.claim(goals)
+            except PyMongoError as e:
+                # Nothing was recorded for these goals, they are claimed again with the next batch
+                print(f"Error claiming goal notifications, retrying {len(goals)}: {str(e)}")
+                retry = goals
+                continue
+            retry = []
+            for match in claimed:
+                print(f"Score changed: {match['home_team']} vs {match['away_team']} {match.get('previous_score')} -> {match['score']}")
+            await self.dispatch(claimed, background=self.background)
+            await self.last_scores.flush()
+
+    async def resend_stale(self):
+        entries = await self.ledger.sweep_stale()
+        if not entries:
+            return
+        found = self.matches.find({'_id': {'$in': [entry['match_id'] for entry in entries]}}, self.fields)
+        matches = {match['_id']: match async for match in found}
+        resend, delivered, superseded = [], [], []
+        for entry in entries:
+            match = matches.get(entry['match_id'])
+            # A match that scored again since is announced by its newer claim
+            if match is not None and match['score'] == entry['score']:
+                resend.append(match)
+                delivered.append(entry.get('delivered', ()))
+            else:
+                superseded.append(entry['_id'])
+        await self.ledger.mark_superseded(superseded)
+        for match in await self.names.expand(resend):
+            print(f"Re-sending unconfirmed goal: {match['home_team']} vs {match['away_team']} {match['score']}")
+        await self.dispatch(resend, delivered)
+
+    async def run_sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.resend_stale()
+            except PyMongoError as e:
+                print(f"Error sweeping stale goal claims: {str(e)}")
+
+def create_goal_claims(ledger, mongodb_client, names, last_scores, send, **options):
+    return GoalClaims(
+        ledger, mongodb_client.db['matches_data'], names, last_scores, send,
+        sweep_interval=float(os.getenv('NOTIFY_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)),
+        **options,
+    )
@@ -2,11 +2,19 @@ import asyncio
 from collections import defaultdict
 from datetime import datetime, timedelta
 import pytz
-from pymongo import UpdateOne
-from db.mongo import MongoDB
+from db.mongo import get_async_mongo
+from db.indexes import ensure_match_indexes
+from db.match_snapshot import MatchSnapshot
+from db.match_timeline import append_timeline, build_timeline_event, ensure_timeline_indexes, utc_now
+from db.match_writer import DEFAULT_BATCH_SIZE, PREVIOUS_FIELDS, build_match_upsert, write_matches
+from db.names import get_name_dictionary, match_key
 from dotenv import load_dotenv
 import os
-from scrapper import goal
+from sources import registry, scrape_sources, shutdown_parser_pool
+from utils.match_values import typed_match_fields
+from utils.metrics import MATCHES_PARSED, span
+from utils.scheduler import create_kickoff_schedule
+from utils.score_events import get_score_bus
 
 load_dotenv()
 
@@ -14,90 +22,174 @@ class GoalDataSaver:
     def __init__(self):
         mongodb_uri = os.getenv('MONGODB_URI')
         mongodb_db_name = os.getenv('MONGODB_DB_NAME')
-        self.mongodb_client = MongoDB(mongodb_uri, mongodb_db_name)
-        self.mongodb_client.db['matches_data'].create_index([('_id', 1), ('date', 1), ('league', 1)], unique=True)
+        self.mongodb_client = get_async_mongo(mongodb_uri, mongodb_db_name)
+        # Registered sources whose result is a list of goal1-style day tables
+        self.match_sources = ('goal1',)
+        # Last persisted state of each match, so unchanged matches are not rewritten
+        self.snapshot = MatchSnapshot()
+        self.names = get_name_dictionary(self.mongodb_client)
+        self.write_batch_size = int(os.getenv('MATCH_WRITE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+        self.score_bus = get_score_bus()
+        # Scrape every few seconds while matches are live, back off when nothing is on
+        self.poll_schedule = create_kickoff_schedule(self.mongodb_client.db['matches_data'])
+
+    async def setup(self):
+        await ensure_match_indexes(self.mongodb_client.db['matches_data'])
+        await ensure_timeline_indexes(self.mongodb_client.db['match_timeline'])
+        await self.names.ensure_indexes()
+        print(f"Loaded {await self.names.load()} team and league names")
+        warm_since = datetime.now(pytz.UTC) - timedelta(days=2)
+        print(f"Loaded {await self.snapshot.warm(self.mongodb_client.db['matches_data'], warm_since)} matches into snapshot")
 
     async def save_matches(self, data):
         try:
             bangkok_tz = pytz.timezone('Asia/Bangkok')
             matches_updates = []
-            previous_score_updates = []
+            avoided_ops = 0
+            score_events = []
+            timeline_events = []
+            observed_at = utc_now()
             match_counts = defaultdict(int)  # To keep track of match order for each league
+            league_counts = defaultdict(int)  # League order restarts for every day table
+            seen_keys = {}  # match_id -> league of the row that took it in this pass
+            # Cached after the first cycle, only names never seen before reach Mongo
+            league_ids = await self.names.intern('league', {item['leagues'] for item in data})
+            team_ids = await self.names.intern('team', {match[side] for item in data for match in item['matches'] for side in ('เจ้าบ้าน', 'ทีมเยือน')})
 
-            for league_index, item in enumerate(data, start=1):
+            for item in data:
+                league_counts[item['date']] += 1
+                league_index = league_counts[item['date']]
                 leagues_name = item['leagues']
                 matches = item['matches']
                 date = datetime.strptime(item['date'], "%Y-%m-%dT%H:%M:%S.%fZ")
 
                 for match in matches:
-                    match_counts[league_index] += 1
-                    match_order = match_counts[league_index]
+                    match_counts[(item['date'], league_index)] += 1
+                    match_order = match_counts[(item['date'], league_index)]
                     
                     try:
                         match_time = datetime.strptime(match['เวลา'], "%H:%M")
                         bangkok_match_datetime = bangkok_tz.localize(datetime.combine(date.date(), match_time.time()))
                         utc_match_datetime = bangkok_match_datetime.astimezone(pytz.UTC)
-                        bangkok_match_time_str = bangkok_match_datetime.strftime('%d%m%Y_%H%M')
                         
                         thai_time_datetime = utc_match_datetime + timedelta(hours=7)  # เพิ่มเวลา 7 ชั่วโมง
                     except ValueError as e:
                         print(f"Error parsing time for match: {match}. Error: {e}")
                         continue
 
-                    match_id = f"{bangkok_match_time_str}_{league_index:02d}_{match_order:02d}"
+                    home_team_id = team_ids[match['เจ้าบ้าน']]
+                    away_team_id = team_ids[match['ทีมเยือน']]
+                    # Page position only orders the display, it is not part of the identity
+                    match_id = match_key(bangkok_match_datetime, home_team_id, away_team_id)
+                    if match_id in seen_keys:
+                        # The same teams twice on one kick-off day (a replay, or a page that lists a
+                        # fixture under two leagues) share a key; the first row wins, the second is
+                        # not allowed to overwrite it in the same bulk write
+                        print(f"Skipping duplicate match {match_id}: {match['เจ้าบ้าน']} vs {match['ทีมเยือน']} "
+                              f"in {leagues_name}, already saved from {seen_keys[match_id]}")
+                        continue
+                    seen_keys[match_id] = leagues_name
+
+                    fields = {
+                        'league_id': league_ids[leagues_name],
+                        'date': thai_time_datetime,
+                        'home_team_id': home_team_id,
+                        'away_team_id': away_team_id,
+                        'odds': match['ราคาบอล'],
+                        'score': match['ผลบอล'],
+                        'time': match['เวลา'],
+                        'bangkok_time': bangkok_match_datetime.strftime("%H:%M"),
+                        'league_order': league_index,
+                        'match_order': match_order,
+                        'signal': match['ทรรศนะฟุตบอลวันนี้'],
+                        # Parsed once here, readers filter and compare the numbers
+                        **typed_match_fields(match['ผลบอล'], match['ราคาบอล']),
+                    }
+                    changed = self.snapshot.diff(match_id, fields)
+                    if changed == {}:
+                        avoided_ops += 1
+                        continue
 
-                    # First operation: Update previous_score if necessary
-                    previous_score_updates.append(UpdateOne(
-                        {'_id': match_id, 'league': leagues_name, 'score': {'$ne': match['ผลบอล']}},
-                        {'$set': {'previous_score': '$score'}},
-                        upsert=False
-                    ))
+                    # Known matches only get the changed fields, previous_score is derived inside the op
+                    now = datetime.now(pytz.UTC) + timedelta(hours=7)
+                    changed_fields = fields if changed is None else changed
+                    set_fields = dict(changed_fields)
+                    set_fields['updated_at'] = now
+                    insert_fields = {key: value for key, value in fields.items() if key not in set_fields}
+                    insert_fields['created_at'] = now
+                    insert_fields.update({f'previous_{field}': initial for field, initial in PREVIOUS_FIELDS.items()})
+                    matches_updates.append(build_match_upsert(match_id, set_fields, insert_fields))
 
-                    # Second operation: Update match data
-                    matches_updates.append(UpdateOne(
-                        {'_id': match_id, 'league': leagues_name},
-                        {'$set': {
-                            'date': thai_time_datetime,
+                    timeline_event = build_timeline_event(changed_fields, observed_at)
+                    if timeline_event:
+                        timeline_events.append((match_id, timeline_event))
+
+                    if changed and 'score' in changed:
+                        score_events.append({
+                            **fields,
+                            '_id': match_id,
+                            'league': leagues_name,
                             'home_team': match['เจ้าบ้าน'],
                             'away_team': match['ทีมเยือน'],
-                            'odds': match['ราคาบอล'],
-                            'score': match['ผลบอล'],
-                            'time': match['เวลา'],
-                            'bangkok_time': bangkok_match_datetime.strftime("%H:%M"),
-                            'league_order': league_index,
-                            'match_order': match_order,
-                            'signal': match['ทรรศนะฟุตบอลวันนี้'],
-                            'updated_at': datetime.now(pytz.UTC) + timedelta(hours=7),
-                        },
-                        '$setOnInsert': {
-                            'created_at': datetime.now(pytz.UTC) + timedelta(hours=7),
-                            'previous_score': '0 - 0',
-                        }},
-                        upsert=True
-                    ))
-
-            # Execute previous_score updates
-            if previous_score_updates:
-                previous_score_result = self.mongodb_client.db['matches_data'].bulk_write(previous_score_updates)
-                print(f"Previous score updates: {previous_score_result.modified_count} modified")
-
-            # Execute match data updates
+                            **{f'previous_{field}': self.snapshot.state[match_id][field] for field in PREVIOUS_FIELDS},
+                            'updated_at': now,
+                        })
+
             print(f"Saving {len(matches_updates)} matches data to database")
-            chunk_size = 100
-            for i in range(0, len(matches_updates), chunk_size):
-                chunk = matches_updates[i:i + chunk_size]
-                matches_result = self.mongodb_client.db['matches_data'].bulk_write(chunk)
-                print(f"Matches data chunk {i//chunk_size + 1}: {matches_result.upserted_count} inserted, {matches_result.modified_count} modified")
+            stats = await write_matches(self.mongodb_client.db['matches_data'], matches_updates, self.write_batch_size)
+            print(f"Matches data: {stats['inserted']} inserted, {stats['modified']} modified "
+                  f"in {stats['batches']} round trips ({stats['elapsed'] * 1000:.0f} ms)")
+
+            try:
+                # The timeline is history only, a failed append must not fail the save
+                await append_timeline(self.mongodb_client.db['match_timeline'], timeline_events)
+                stats['timeline_events'] = len(timeline_events)
+            except Exception as e:
+                print(f"Error appending match timeline: {str(e)}")
+
+            self.snapshot.commit()
+            for event in score_events:
+                self.score_bus.publish(event)
+            self.snapshot.avoided_ops += avoided_ops
+            stats['avoided'] = avoided_ops
+            print(f"Skipped {avoided_ops} write ops for unchanged data ({self.snapshot.avoided_ops} in total)")
+            return stats
 
         except Exception as e:
+            self.snapshot.rollback()
             print(f"Error saving leagues and matches data to database: {str(e)}")
+            return None
 
     async def run(self):
-        while True:
-            try:
-                data = goal(0)
-                await self.save_matches(data)
-                print(f"Processed {len(data)} items")
-            except Exception as e:
-                print(f"Error processing goal data: {str(e)}")
-            await asyncio.sleep(60)  # Sleep for 30 seconds
\ No newline at end of file
+        await self.setup()
+        try:
+            while True:
+                try:
+                    with span('scrape'):
+                        results = await scrape_sources(registry)
+                    for name in self.match_sources:
+                        result = results.get(name)
+                        if result is None or result['error']:
+                            continue
+                        tracker = registry.get(name).tracker
+                        if result['unchanged']:
+                            print(f"No changes on {name}, skipped {tracker.skipped_cycles} cycles so far")
+                            continue
+                        data = [item for day in result['data'] for item in day]
+                        MATCHES_PARSED.inc(sum(len(item['matches']) for item in data))
+                        with span('save'):
+                            stats = await self.save_matches(data)
+                        if stats and tracker is not None:
+                            tracker.commit()
+                        if stats and stats['inserted']:
+                            # New fixtures may open a live window earlier than the known ones
+                            self.poll_schedule.invalidate()
+                        print(f"Processed {len(data)} items from {name}")
+                    self.snapshot.prune(datetime.now(pytz.UTC) - timedelta(days=2))
+                except Exception as e:
+                    print(f"Error processing goal data: {str(e)}")
+                interval = await self.poll_schedule.next_interval()
+                print(f"Next scrape in {interval:.0f}s")
+                await asyncio.sleep(interval)
+        finally:
+            shutdown_parser_pool()
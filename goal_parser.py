@@ -0,0 +1,364 @@
+from collections import deque
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from bs4 import BeautifulSoup as Soup, SoupStrainer
+from utils.thai_date_utils import ThaiDateConverter
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+DAY_TABLE_STYLE = 'border:1px #000 solid'
+LEAGUE_CLASS = 'utable_league'
+AWAY_TEAM_CLASS = 'utable_f4 f'
+
+# td class -> match key, in the order keys appear in each match dict
+CELL_KEYS = {
+    'utable_f1 f': 'เวลา',
+    'utable_f2 f': 'เจ้าบ้าน',
+    'utable_f3 f classodds': 'ราคาบอล',
+    'utable_f4 f': 'ทีมเยือน',
+    'utable_f7 f': 'ครึี่งแรก',
+    'utable_f5 f classmore': 'ผลบอล',
+    'utable_f6 f': 'ทรรศนะฟุตบอลวันนี้',
+}
+
+TODAY_TABLE_ONLY = SoupStrainer('div', id='todaytable')
+
+def format_string(s: str) -> str:
+    return ' '.join(s.replace('\xa0', ' ').split())
+
+def available_backends() -> List[str]:
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if HAS_LXML:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+def default_backend() -> str:
+    return available_backends()[0]
+
+class _DayBuilder:
+    # Collects league blocks for one day table; the date header is converted at most once
+    def __init__(self, header: Optional[str], converter: ThaiDateConverter, on_league=None):
+        self.header = header
+        self.converter = converter
+        self.on_league = on_league
+        self.date = None
+        self.date_ready = False
+        self.data = []
+        self.current_league = None
+        self.current_matches = []
+
+    def get_date(self):
+        if not self.date_ready:
+            self.date = self.converter.to_utc_format(format_string(self.header) if self.header is not None else None)
+            self.date_ready = True
+        return self.date
+
+    def flush(self):
+        if self.current_league:
+            record = {
+                'date': self.get_date(),
+                'leagues': self.current_league,
+                'matches': self.current_matches
+            }
+            if self.on_league:
+                self.on_league(record)
+            else:
+                self.data.append(record)
+
+    def league(self, name: str):
+        self.flush()
+        self.current_league = name
+        self.current_matches = []
+
+    def row(self, cells: Dict[str, str]):
+        match = {}
+        for class_name, key in CELL_KEYS.items():
+            if class_name in cells:
+                match[key] = cells[class_name]
+        if match:
+            self.current_matches.append(match)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self.flush()
+        return self.data
+
+def _bs4_day_divs(html: str, features: str):
+    soup = Soup(html, features, parse_only=TODAY_TABLE_ONLY)
+    today_table = soup.find('div', id='todaytable')
+    if not today_table:
+        return None
+    return [div for div in today_table.find_all('div') if DAY_TABLE_STYLE in (div.get('style') or '')]
+
+def _bs4_parse_day(target_div, converter: ThaiDateConverter) -> List[Dict[str, Any]]:
+    strong = target_div.find('strong')
+    day = _DayBuilder(strong.text if strong else None, converter)
+    for tr in target_div.find_all('tr'):
+        cells = {}
+        is_league = False
+        league_text = None
+        for td in tr.find_all('td'):
+            classes = td.get('class') or []
+            if LEAGUE_CLASS in classes:
+                if not is_league:
+                    is_league = True
+                    league_text = td.text
+                continue
+            class_name = ' '.join(classes)
+            if class_name in CELL_KEYS and class_name not in cells:
+                if class_name == AWAY_TEAM_CLASS:
+                    span = td.find('span')
+                    cells[class_name] = format_string(span.text if span else td.text)
+                else:
+                    cells[class_name] = format_string(td.text)
+        if is_league:
+            day.league(format_string(league_text))
+        else:
+            day.row(cells)
+    return day.finish()
+
+def _lexbor_day_divs(html: str):
+    tree = LexborHTMLParser(html)
+    today_table = tree.css_first('div#todaytable')
+    if today_table is None:
+        return None
+    return [div for div in today_table.css('div') if DAY_TABLE_STYLE in (div.attributes.get('style') or '')]
+
+def _lexbor_parse_day(target_div, converter: ThaiDateConverter) -> List[Dict[str, Any]]:
+    strong = target_div.css_first('strong')
+    day = _DayBuilder(strong.text() if strong is not None else None, converter)
+    for tr in target_div.css('tr'):
+        cells = {}
+        is_league = False
+        league_text = None
+        for td in tr.css('td'):
+            class_attr = td.attributes.get('class') or ''
+            classes = class_attr.split()
+            if LEAGUE_CLASS in classes:
+                if not is_league:
+                    is_league = True
+                    league_text = td.text()
+                continue
+            class_name = ' '.join(classes)
+            if class_name in CELL_KEYS and class_name not in cells:
+                if class_name == AWAY_TEAM_CLASS:
+                    span = td.css_first('span')
+                    cells[class_name] = format_string(span.text() if span is not None else td.text())
+                else:
+                    cells[class_name] = format_string(td.text())
+        if is_league:
+            day.league(format_string(league_text))
+        else:
+            day.row(cells)
+    return day.finish()
+
+def _day_divs(html: str, backend: Optional[str]):
+    backend = backend or default_backend()
+    if backend == 'selectolax':
+        return _lexbor_day_divs(html), _lexbor_parse_day
+    if backend in ('lxml', 'html.parser'):
+        return _bs4_day_divs(html, backend), _bs4_parse_day
+    raise ValueError(f"Unknown parser backend: {backend}")
+
+def iter_day_tables(html: str, backend: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    # The document is parsed once; each day table is only walked when the caller asks for it
+    target_divs, parse_day = _day_divs(html, backend)
+    if target_divs is None:
+        print("Could not find the todaytable.")
+        return
+    if not target_divs:
+        print("Could not find any div with border style.")
+        return
+    converter = ThaiDateConverter()
+    for target_div in target_divs:
+        yield parse_day(target_div, converter)
+
+def parse_all_day_tables(html: str, backend: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+    return list(iter_day_tables(html, backend))
+
+def parse_day_tables(html: str, index: int = 0, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+    target_divs, parse_day = _day_divs(html, backend)
+
+    if target_divs is None:
+        print("Could not find the todaytable.")
+        return []
+
+    if not target_divs:
+        print("Could not find any div with border style.")
+        return []
+
+    if index >= len(target_divs):
+        print(f"Index {index} is out of range. Only {len(target_divs)} divs found.")
+        return []
+
+    return parse_day(target_divs[index], ThaiDateConverter())
+
+class StreamingGoalParser(HTMLParser):
+    # Incremental parser fed with text chunks. It keeps no DOM, only the state of the
+    # row being read, and hands out each league record as soon as its block is complete.
+    # A day's date comes from the first <strong> seen before its first league ends.
+    def __init__(self, index: Optional[int] = 0):
+        super().__init__(convert_charrefs=True)
+        self.index = index
+        self.converter = ThaiDateConverter()
+        self.ready = deque()
+        self.done = False
+        self.table_depth = 0
+        self.day_index = -1
+        self.day = None
+        self.day_depth = 0
+        self.header_parts = None
+        self.strong_depth = 0
+        self.row = None
+        self.cell = None
+        self.span_depth = 0
+
+    def feed_chunk(self, chunk: str) -> List[Dict[str, Any]]:
+        if not self.done:
+            self.feed(chunk)
+        return self.drain()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        if not self.done:
+            self.close()
+            self._end_day()
+            self.done = True
+        return self.drain()
+
+    def drain(self) -> List[Dict[str, Any]]:
+        records = list(self.ready)
+        self.ready.clear()
+        return records
+
+    def _wanted(self) -> bool:
+        return self.index is None or self.day_index == self.index
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'div':
+            if self.table_depth:
+                self.table_depth += 1
+                style = dict(attrs).get('style') or ''
+                if DAY_TABLE_STYLE in style:
+                    self._end_day()
+                    self.day_index += 1
+                    if self._wanted():
+                        self.day = _DayBuilder(None, self.converter, self.ready.append)
+                        self.day_depth = self.table_depth
+            elif dict(attrs).get('id') == 'todaytable':
+                self.table_depth = 1
+            return
+        if self.day is None:
+            return
+        if tag == 'strong':
+            if self.header_parts is None:
+                self.header_parts = []
+            if self.strong_depth or self.day.header is None:
+                self.strong_depth += 1
+        elif tag == 'tr':
+            self._end_row()
+            self.row = {'cells': {}, 'league': None}
+        elif tag == 'td' and self.row is not None:
+            self._end_cell()
+            classes = (dict(attrs).get('class') or '').split()
+            self.cell = {'classes': classes, 'text': [], 'span': None}
+        elif tag == 'span' and self.cell is not None:
+            if self.span_depth:
+                self.span_depth += 1
+            elif self.cell['span'] is None:
+                # Only the first span of a cell is read, like td.find('span')
+                self.cell['span'] = []
+                self.span_depth = 1
+
+    def handle_endtag(self, tag):
+        if self.done or not self.table_depth:
+            return
+        if tag == 'div':
+            if self.day is not None and self.table_depth == self.day_depth:
+                self._end_day()
+            self.table_depth -= 1
+            if self.table_depth == 0:
+                self._end_day()
+                self.done = True
+            elif self.index is not None and self.day_index >= self.index and self.day is None:
+                # The requested day table is finished, nothing after it is needed
+                self.done = True
+            return
+        if self.day is None:
+            return
+        if tag == 'strong' and self.strong_depth:
+            self.strong_depth -= 1
+            if self.strong_depth == 0:
+                self.day.header = ''.join(self.header_parts)
+        elif tag == 'span' and self.span_depth:
+            self.span_depth -= 1
+        elif tag == 'td':
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+
+    def handle_data(self, data):
+        if self.day is None:
+            return
+        if self.strong_depth:
+            self.header_parts.append(data)
+        if self.cell is not None:
+            self.cell['text'].append(data)
+            if self.span_depth:
+                self.cell['span'].append(data)
+
+    def _end_cell(self):
+        cell, self.cell = self.cell, None
+        self.span_depth = 0
+        if cell is None or self.row is None:
+            return
+        row = self.row
+        if LEAGUE_CLASS in cell['classes']:
+            if row['league'] is None:
+                row['league'] = ''.join(cell['text'])
+            return
+        class_name = ' '.join(cell['classes'])
+        if class_name in CELL_KEYS and class_name not in row['cells']:
+            if class_name == AWAY_TEAM_CLASS and cell['span'] is not None:
+                row['cells'][class_name] = format_string(''.join(cell['span']))
+            else:
+                row['cells'][class_name] = format_string(''.join(cell['text']))
+
+    def _end_row(self):
+        self._end_cell()
+        row, self.row = self.row, None
+        if row is None or self.day is None:
+            return
+        if row['league'] is not None:
+            self.day.league(format_string(row['league']))
+        else:
+            self.day.row(row['cells'])
+
+    def _end_day(self):
+        if self.day is None:
+            return
+        self._end_row()
+        self.day.finish()
+        self.day = None
+        self.header_parts = None
+        self.strong_depth = 0
+
+def iter_stream_records(chunks: Iterable[str], index: Optional[int] = 0) -> Iterator[Dict[str, Any]]:
+    parser = StreamingGoalParser(index)
+    for chunk in chunks:
+        yield from parser.feed_chunk(chunk)
+        if parser.done:
+            break
+    yield from parser.finish()
@@ -1,26 +1,56 @@
 import asyncio
-from itertools import groupby
 import os
-from db.mongo import MongoDB
+from db.daily_schedule import get_schedule_cache, schedule_day
+from db.leases import create_lease, run_as_leader
+from db.mongo import get_async_mongo
+from db.names import get_name_dictionary
+from db.notification_ledger import create_goal_claims, create_notification_ledger
 from dotenv import load_dotenv
 from pymongo.errors import PyMongoError
 import telebot
 from telebot.async_telebot import AsyncTeleBot
 from datetime import datetime, timedelta
 import pytz
+from utils.telegram_delivery import TelegramDeliveryQueue
+from utils.match_state import create_match_state_store
+from utils.scheduler import Scheduler, create_kickoff_schedule
+from utils.score_events import ScoreEventBus, get_score_bus, watch_score_changes
 
 load_dotenv()
 
 class GoalTelegramBot:
-    def __init__(self):
+    def __init__(self, notify_mode=None):
         mongodb_uri = os.getenv('MONGODB_URI')
         mongodb_db_name = os.getenv('MONGODB_DB_NAME')
-        self.mongodb_client = MongoDB(mongodb_uri, mongodb_db_name)
+        self.mongodb_client = get_async_mongo(mongodb_uri, mongodb_db_name)
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.group_id = os.getenv('TELEGRAM_GROUP_ID')
         self.bot = AsyncTeleBot(self.bot_token, parse_mode='HTML')
-        self.last_scores = {}
-        self.last_schedule_date = None
+        # Messages go through a rate-limited queue so scanning never waits on Telegram
+        self.delivery = TelegramDeliveryQueue(
+            self.bot,
+            workers=int(os.getenv('TELEGRAM_DELIVERY_WORKERS', 2)),
+            drain_timeout=float(os.getenv('TELEGRAM_DRAIN_TIMEOUT', 10)),
+        )
+        # Bounded, expiring and persisted, so a restart still knows the scores seen before it
+        self.last_scores = create_match_state_store('telegram', self.mongodb_client)
+        # Shared by every instance: a goal is claimed there before it is sent, so it goes out once
+        self.ledger = create_notification_ledger(self.mongodb_client, 'telegram')
+        # matches_data stores league and team ids, messages need the names
+        self.names = get_name_dictionary(self.mongodb_client)
+        # Claims before sending, retries failed claims and re-sends claims never marked sent
+        self.claims = create_goal_claims(self.ledger, self.mongodb_client, self.names, self.last_scores, self.send_goal_notification)
+        # 'events': score changes published in-process by GoalDataSaver
+        # 'change_stream': score changes read from a matches_data change stream
+        # 'poll': re-read matches_data, every few seconds while matches are live
+        self.notify_mode = notify_mode or os.getenv('NOTIFY_MODE', 'events')
+        # A change stream gets a private bus so it never doubles up with in-process events
+        self.score_bus = ScoreEventBus() if self.notify_mode == 'change_stream' else get_score_bus()
+        self.schedule_cache = get_schedule_cache(self.mongodb_client)
+        self.poll_schedule = create_kickoff_schedule(self.mongodb_client.db['matches_data'])
+        # The last run is kept in Mongo so a restart after noon neither skips nor repeats the schedule
+        self.scheduler = Scheduler(self.mongodb_client.db['scheduled_jobs'])
+        self.scheduler.daily('telegram_daily_schedule', os.getenv('DAILY_SCHEDULE_TIME', '12:00'), self.send_daily_schedule)
 
     async def check_for_goals(self):
         try:
@@ -32,42 +62,58 @@ class GoalTelegramBot:
                 'date': {'$gte': one_day_ago, '$lte': now}
             }).sort('date', 1)
 
-            for match in matches:
-                match_id = match['_id']
-                current_score = match['score']
-                # await self.send_goal_notification(match)
-
-                if match_id in self.last_scores and self.last_scores[match_id] != current_score:
-                    await self.send_goal_notification(match)
-                
-                self.last_scores[match_id] = current_score
-                
-                print(f"Checking for goals: {match['home_team']} vs {match['away_team']}")
+            goals = []
+            async for match in matches:
+                previous_score = self.last_scores.get(match['_id'])
+                if previous_score is not None and previous_score != match['score']:
+                    # Recorded once delivered, a failed claim is simply found again next cycle
+                    goals.append(match)
+                else:
+                    self.last_scores.set(match['_id'], match['score'])
+
+            # One claim for the whole cycle, goals another instance already claimed are skipped
+            claimed = await self.claims.claim(goals)
+            for match in claimed:
+                print(f"Goal: {match['home_team']} vs {match['away_team']} {match['score']}")
+                await self.send_goal_notification(match)
+            await self.last_scores.flush()
         except PyMongoError as e:
             print(f"Error reading from database: {str(e)}")
 
-    async def send_goal_notification(self, match):
-        message = self.create_table_message(match)
+    async def consume_score_events(self, queue):
         try:
-            await self.bot.send_message(chat_id=self.group_id, text=message, parse_mode='HTML')
-            print(f"Telegram message sent successfully for {match['home_team']} vs {match['away_team']}")
-        except Exception as e:
-            print(f"Error sending Telegram message: {str(e)}")
+            await self.claims.consume(queue)
+        finally:
+            self.score_bus.unsubscribe(queue)
+
+    async def send_goal_notification(self, match, delivered=()):
+        # One group chat, so a goal is never partly delivered and `delivered` is always empty
+        message = self.create_table_message(match)
+        key = self.ledger.key(match)
+
+        async def on_sent():
+            # Only a delivered goal counts as seen, one dropped on the way is swept from the ledger
+            await self.ledger.mark_sent([key])
+            self.last_scores.set(match['_id'], match['score'])
+            await self.last_scores.flush()
+
+        self.delivery.enqueue(self.group_id, message, merge_key=match['_id'], on_sent=on_sent)
+        print(f"Telegram message queued for {match['home_team']} vs {match['away_team']}")
 
     def create_table_message(self, match):
-        score_parts = match['score'].split(' - ')
-        home_score = int(score_parts[0]) if len(score_parts) > 0 and score_parts[0].isdigit() else 0
-        away_score = int(score_parts[1]) if len(score_parts) > 1 and score_parts[1].isdigit() else 0
-        
-        previous_score_parts = match['previous_score'].split(' - ')
-        previous_home_score = int(previous_score_parts[0]) if len(previous_score_parts) > 0 and previous_score_parts[0].isdigit() else 0
-        previous_away_score = int(previous_score_parts[1]) if len(previous_score_parts) > 1 and previous_score_parts[1].isdigit() else 0
-        
+        # Parsed at ingest, None when the page showed no score (before kick-off, postponed).
+        # An unknown side is shown as 0 but never counted as a goal.
+        scores = [match.get(field) for field in ('score_home', 'score_away', 'previous_score_home', 'previous_score_away')]
+        home_score, away_score, previous_home_score, previous_away_score = scores
+
         goal_message = ""
-        if home_score > previous_home_score:
-            goal_message = f"🎉 {match['home_team']} ทำประตู! 🎉"
-        elif away_score > previous_away_score:
-            goal_message = f"🎉 {match['away_team']} ทำประตู! 🎉"
+        if None not in scores:
+            if home_score > previous_home_score:
+                goal_message = f"🎉 {match['home_team']} ทำประตู! 🎉"
+            elif away_score > previous_away_score:
+                goal_message = f"🎉 {match['away_team']} ทำประตู! 🎉"
+        home_score = home_score if home_score is not None else 0
+        away_score = away_score if away_score is not None else 0
         
         # สร้างข้อความพื้นฐาน
         base_message = (
@@ -92,65 +138,49 @@ class GoalTelegramBot:
         return message
     
     async def send_daily_schedule(self):
-        try:
-            bangkok_tz = pytz.timezone('Asia/Bangkok')
-            now = datetime.now(bangkok_tz)
-            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            matches = list(self.mongodb_client.db['matches_data'].find({
-                'date': {'$gte': today}
-            }).sort([('league', 1), ('date', 1)]))
-
-            # Group matches by league
-            grouped_matches = groupby(matches, key=lambda x: x['league'])
-
-            for league, league_matches in grouped_matches:
-                message = self.create_daily_schedule_message(league, list(league_matches))
-                await self.bot.send_message(chat_id=self.group_id, text=message, parse_mode='HTML')
-                print(f"Daily schedule for {league} sent successfully")
-                await asyncio.sleep(1)  # Add a small delay between messages
-
-            print("All league schedules sent successfully")
-            self.last_schedule_date = now.date()
-        except Exception as e:
-            print(f"Error sending daily schedules: {str(e)}")
-
-    def create_daily_schedule_message(self, league, matches):
-        message = f"📅 <b>ตารางการแข่งขันฟุตบอลวันนี้</b> 📅\n"
-        message += f"<code>{league}</code>\n\n"
-
-        for match in matches:
-            message += (
-                f"<code>"
-                f"🏠 <b>ทีมเหย้า:</b> {match['home_team']}\n"
-                f"🛫 <b>ทีมเยือน:</b> {match['away_team']}\n"
-                f"⚽ <b>ผลการแข่งขัน:</b> {match['score']}\n"
-                f"💰 <b>ราคาบอล:</b> {match['odds']}\n"
-                f"🔮 <b>ทรรศนะฟุตบอลวันนี้:</b> {match.get('signal', 'ไม่มีข้อมูล')}\n"
-                f"🕒 <b>เวลาเตะ:</b> {match['bangkok_time']}\n"
-                f"⎯⎯⎯⎯⎯⎯⎯⎯⎯⎯⎯"
-                f"</code>\n"
-            )
-
-        message += f"#{league.replace(' ', '')}\n\n"
-        return message
+        # Grouped and rendered once per cache period, the web API serves the same entry.
+        # Errors propagate to the scheduler, which retries the day's slot.
+        entry = await self.schedule_cache.get(schedule_day())
+        for league in entry.value['leagues']:
+            for message in league['messages']:
+                self.delivery.enqueue(self.group_id, message)
+            print(f"Daily schedule for {league['league']} queued ({len(league['messages'])} messages)")
+
+        print("All league schedules queued")
 
     async def run(self):
-        while True:
-            await self.check_for_goals()
-            
-            bangkok_tz = pytz.timezone('Asia/Bangkok')
-            now = datetime.now(bangkok_tz)
-            
-            # Check if it's noon and we haven't sent the schedule today
-            if now.hour == 12 and now.minute == 0 and (self.last_schedule_date is None or self.last_schedule_date < now.date()):
-                await self.send_daily_schedule()
+        print(f"Loaded {await self.last_scores.load()} match states")
+        self.delivery.start()
+        tasks = [asyncio.create_task(self.claims.run_sweeper())]
+        if self.notify_mode == 'change_stream':
+            tasks.append(asyncio.create_task(watch_score_changes(self.mongodb_client.db['matches_data'], self.score_bus)))
+        if self.notify_mode in ('events', 'change_stream'):
+            tasks.append(asyncio.create_task(self.consume_score_events(self.score_bus.subscribe())))
 
-            await asyncio.sleep(60)  # Check every minute
+        self.scheduler.start()
+
+        try:
+            while True:
+                if self.notify_mode == 'poll':
+                    await self.check_for_goals()
+                    interval = await self.poll_schedule.next_interval()
+                else:
+                    # Goals arrive as events, the loop only expires old match state
+                    interval = self.poll_schedule.idle_interval
+                self.last_scores.expire()
+                await asyncio.sleep(interval)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.scheduler.stop()
+            await self.delivery.stop()
 
 async def main():
-    bot = GoalTelegramBot()
-    await bot.run()
+    # Running on its own there is no GoalDataSaver in this process to publish events
+    async def run_bot():
+        bot = GoalTelegramBot(notify_mode=os.getenv('NOTIFY_MODE', 'change_stream'))
+        await bot.run()
+    await run_as_leader(create_lease(get_async_mongo(), 'goal_telegram_bot'), run_bot)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,6 +1,10 @@
 import asyncio
 from goal_data_saver import GoalDataSaver
 from goal_telegram_bot import GoalTelegramBot
+from utils.async_fetcher import close_fetcher
+from db.leases import create_lease, run_as_leader
+from db.mongo import close_async_mongo, get_async_mongo
+from utils.metrics import start_metrics_server
 
 async def run_data_saver():
     saver = GoalDataSaver()
@@ -10,12 +14,26 @@ async def run_telegram_bot():
     bot = GoalTelegramBot()
     await bot.run()
 
-async def main():
+async def run_pipeline():
     # Run both processes concurrently
     await asyncio.gather(
         run_data_saver(),
         run_telegram_bot()
     )
 
+async def main():
+    # Only the lease holder scrapes and notifies, other nodes stand by and take over when it goes away.
+    # Fresh instances are built on every election, so no state from an earlier term is reused.
+    lease = create_lease(get_async_mongo(), 'goal_pipeline')
+    # Every node exports, standby nodes just report idle counters
+    metrics_server = await start_metrics_server()
+    try:
+        await run_as_leader(lease, run_pipeline)
+    finally:
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        await close_fetcher()
+        close_async_mongo()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
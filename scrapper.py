@@ -1,114 +1,144 @@
+import asyncio
+import hashlib
+import os
+import re
 import requests
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup as Soup
-from utils.thai_date_utils import ThaiDateConverter
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+from itertools import islice
+from goal_parser import StreamingGoalParser, iter_day_tables, parse_day_tables, format_string  # noqa: F401
+from utils.async_fetcher import get_fetcher
+from utils.metrics import PARSE_SECONDS
 
 URL = 'https://goal1.co/'
 
+def parser_backend() -> Optional[str]:
+    # selectolax, lxml or html.parser; unset picks the fastest one installed.
+    # Read per parse, the entry points only load .env after importing this module.
+    return os.getenv('GOAL_PARSER_BACKEND') or None
+
+# Reused across calls so the sync path keeps its connection alive too
+_session = requests.Session()
+
 def fetch_with_requests(url: str) -> str:
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
     }
-    response = requests.get(url, headers=headers)
+    response = _session.get(url, headers=headers, timeout=20)
     response.raise_for_status()  # This will raise an exception for HTTP errors
     return response.text
 
-def format_string(s: str) -> str:
-    return ' '.join(s.replace('\xa0', ' ').split())
+async def fetch_async(url: str) -> str:
+    return await get_fetcher().fetch_text(url)
+
+TODAY_TABLE_START = re.compile(r'<div[^>]*\bid\s*=\s*["\']?todaytable\b', re.IGNORECASE)
+DIV_TAG = re.compile(r'<(/?)div\b', re.IGNORECASE)
+
+def extract_today_table(html: str) -> Optional[str]:
+    # Cheap string scan for the #todaytable fragment, no DOM is built here
+    start = TODAY_TABLE_START.search(html)
+    if not start:
+        return None
+    depth = 0
+    for tag in DIV_TAG.finditer(html, start.start()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[start.start():tag.end()]
+    return html[start.start():]
+
+class PageChangeTracker:
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.last_hash = None
+        self.skipped_cycles = 0
+        self._pending = None
+
+    def is_unchanged(self, html: Optional[str], etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        if html is None:
+            # Server answered 304 Not Modified
+            self.skipped_cycles += 1
+            return True
+        fragment = extract_today_table(html)
+        digest = hashlib.sha1((fragment if fragment is not None else html).encode('utf-8')).hexdigest()
+        if digest == self.last_hash:
+            # Same content as the stored copy, so the fresh validators are safe to adopt
+            self.etag, self.last_modified = etag, last_modified
+            self.skipped_cycles += 1
+            return True
+        self._pending = (digest, etag, last_modified)
+        return False
+
+    def commit(self):
+        # Only remember the page once its data has been stored, so a failed save is retried
+        if self._pending:
+            self.last_hash, self.etag, self.last_modified = self._pending
+            self._pending = None
 
 def goal(index: int = 0) -> List[Dict[str, Any]]:
-    data = []
-    converter = ThaiDateConverter()
-    
     print(f'Fetching data from Goal1.co (index: {index})')
     html = fetch_with_requests(URL)
-    
-    soup = Soup(html, 'html.parser')
-    
-    # Find the todaytable
-    today_table = soup.find('div', id='todaytable')
-    
-    if not today_table:
-        print("Could not find the todaytable.")
-        return data
-
-    # Find all divs inside todaytable with 'border:1px #000 solid' in their style
-    target_divs = today_table.find_all('div', style=lambda value: value and 'border:1px #000 solid' in value)
-    
-    if not target_divs:
-        print("Could not find any div with border style.")
-        return data
-    
-    if index >= len(target_divs):
-        print(f"Index {index} is out of range. Only {len(target_divs)} divs found.")
-        return data
-
-    target_div = target_divs[index]
-    tbody_tags = target_div.find_all('tr')
-
-    current_league = None
-    current_matches = []
-
-    for tbody in tbody_tags:
-        league_td = tbody.find('td', class_='utable_league')
-        if league_td:
-            if current_league:
-                data.append({
-                    'date': converter.to_utc_format(format_string(target_div.find('strong').text) if target_div.find('strong') else None),
-                    'leagues': current_league,
-                    'matches': current_matches
-                })
-            current_league = format_string(league_td.text)
-            current_matches = []
-        else:
-            match = {}
-            for class_name, key in [
-                ('utable_f1 f', 'เวลา'),
-                ('utable_f2 f', 'เจ้าบ้าน'),
-                ('utable_f3 f classodds', 'ราคาบอล'),
-                ('utable_f4 f', 'ทีมเยือน'),
-                ('utable_f7 f', 'ครึี่งแรก'),
-                ('utable_f5 f classmore', 'ผลบอล'),
-                ('utable_f6 f', 'ทรรศนะฟุตบอลวันนี้')
-            ]:
-                td = tbody.find('td', class_=class_name)
-                if td:
-                    if class_name == 'utable_f4 f':
-                        span = td.find('span')
-                        match[key] = format_string(span.text if span else td.text)
-                    else:
-                        match[key] = format_string(td.text)
-            if match:
-                current_matches.append(match)
-
-    # Add the last league after the loop
-    if current_league:
-        data.append({
-            'date': converter.to_utc_format(format_string(target_div.find('strong').text) if target_div.find('strong') else None),
-            'leagues': current_league,
-            'matches': current_matches
-        })
-            
-    return data
+    with PARSE_SECONDS.time(source='goal1'):
+        return parse_goal(html, index)
+
+async def goal_async(index: int = 0) -> List[Dict[str, Any]]:
+    print(f'Fetching data from Goal1.co (index: {index})')
+    html = await fetch_async(URL)
+    # Parsing is CPU-bound, keep it off the event loop
+    with PARSE_SECONDS.time(source='goal1'):
+        return await asyncio.to_thread(parse_goal, html, index)
+
+def iter_goal_days() -> Iterator[List[Dict[str, Any]]]:
+    print('Fetching all day tables from Goal1.co')
+    html = fetch_with_requests(URL)
+    return iter_day_tables(html, parser_backend())
+
+def goal_all(days: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    print('Fetching all day tables from Goal1.co')
+    html = fetch_with_requests(URL)
+    with PARSE_SECONDS.time(source='goal1'):
+        return parse_goal_days(html, days)
+
+async def goal_all_async(days: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    print('Fetching all day tables from Goal1.co')
+    html = await fetch_async(URL)
+    with PARSE_SECONDS.time(source='goal1'):
+        return await asyncio.to_thread(parse_goal_days, html, days)
+
+async def goal_if_changed(tracker: PageChangeTracker, days: Optional[int] = 1) -> Optional[List[List[Dict[str, Any]]]]:
+    html, etag, last_modified = await get_fetcher().fetch_conditional(URL, tracker.etag, tracker.last_modified)
+    if tracker.is_unchanged(html, etag, last_modified):
+        return None
+    with PARSE_SECONDS.time(source='goal1'):
+        return await asyncio.to_thread(parse_goal_days, html, days)
+
+async def goal_stream(index: Optional[int] = 0) -> AsyncIterator[Dict[str, Any]]:
+    # Yields league records while the page is still downloading; index=None streams every day table
+    print(f'Streaming data from Goal1.co (index: {index})')
+    parser = StreamingGoalParser(index)
+    async for chunk in get_fetcher().stream_text(URL):
+        for record in parser.feed_chunk(chunk):
+            yield record
+        if parser.done:
+            break
+    for record in parser.finish():
+        yield record
+
+def parse_goal(html: str, index: int = 0) -> List[Dict[str, Any]]:
+    return parse_day_tables(html, index, parser_backend())
+
+def parse_goal_days(html: str, days: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    # One parse of the page, then the first `days` day tables (all of them when days is None)
+    return list(islice(iter_day_tables(html, parser_backend()), days))
 
 def main():
-    # Get data from the first div (index 0)
-    result = goal(0)
-    print("Data from the first div:")
-    for item in result:
-        print(f"Date: {item['date']}")
-        print(f"League: {item['leagues']}")
-        print(f"Number of matches: {len(item['matches'])}")
-        print("---")
-
-    # Uncomment the following lines to get data from the second div (index 1)
-    # result = goal(1)
-    # print("\nData from the second div:")
-    # for item in result:
-    #     print(f"Date: {item['date']}")
-    #     print(f"League: {item['leagues']}")
-    #     print(f"Number of matches: {len(item['matches'])}")
-    #     print("---")
+    # Today and tomorrow come from a single download and parse
+    for index, result in enumerate(goal_all(days=2)):
+        print(f"Data from div {index}:")
+        for item in result:
+            print(f"Date: {item['date']}")
+            print(f"League: {item['leagues']}")
+            print(f"Number of matches: {len(item['matches'])}")
+            print("---")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
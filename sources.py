@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional
+from scrapper import URL, PageChangeTracker, parse_goal_days
+from utils.async_fetcher import get_fetcher
+from utils.metrics import PARSE_SECONDS
+
+class Source:
+    # parser must be picklable (a module-level function or a functools.partial of one)
+    # because it runs in a worker process
+    def __init__(self, name: str, url: str, parser: Callable[[str], Any], track_changes: bool = False):
+        self.name = name
+        self.url = url
+        self.parser = parser
+        self.tracker = PageChangeTracker() if track_changes else None
+
+class SourceRegistry:
+    def __init__(self):
+        self.sources: Dict[str, Source] = {}
+
+    def register(self, source: Source) -> Source:
+        self.sources[source.name] = source
+        return source
+
+    def unregister(self, name: str):
+        self.sources.pop(name, None)
+
+    def get(self, name: str) -> Source:
+        return self.sources[name]
+
+    def __iter__(self):
+        return iter(list(self.sources.values()))
+
+def parse_scrape_days(html: str):
+    # SCRAPE_DAYS day tables (today, tomorrow, ...) are ingested from goal1 per cycle. Read on every
+    # parse: entry points load .env after importing this module, workers inherit the loaded env.
+    return parse_goal_days(html, int(os.getenv('SCRAPE_DAYS', 1)))
+
+registry = SourceRegistry()
+registry.register(Source('goal1', URL, parse_scrape_days, track_changes=True))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parser_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent already runs Motor and aiohttp threads
+        _pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv('PARSER_PROCESSES', os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _pool
+
+def shutdown_parser_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def reset_parser_pool(pool: ProcessPoolExecutor):
+    # A worker that died (OOM, a crash in a parser C extension) breaks the whole pool for good,
+    # so it is dropped and the next get_parser_pool() spawns a fresh one. Only the broken pool is
+    # replaced, concurrent scrapes that hit the same failure do not throw away a new one.
+    global _pool
+    pool.shutdown(wait=False, cancel_futures=True)
+    if _pool is pool:
+        _pool = None
+
+def timed_parse(parser: Callable[[str], Any], html: str):
+    started = time.perf_counter()
+    result = parser(html)
+    return result, time.perf_counter() - started
+
+async def scrape_source(source: Source, executor=None) -> Dict[str, Any]:
+    result = {'name': source.name, 'data': None, 'unchanged': False, 'error': None,
+              'bytes': 0, 'fetch_time': 0.0, 'parse_time': 0.0, 'total_time': 0.0}
+    started = time.perf_counter()
+    try:
+        fetcher = get_fetcher()
+        if source.tracker is not None:
+            html, etag, last_modified = await fetcher.fetch_conditional(source.url, source.tracker.etag, source.tracker.last_modified)
+            unchanged = source.tracker.is_unchanged(html, etag, last_modified)
+        else:
+            html = await fetcher.fetch_text(source.url)
+            unchanged = False
+        result['fetch_time'] = time.perf_counter() - started
+        if unchanged:
+            result['unchanged'] = True
+        else:
+            result['bytes'] = len(html.encode('utf-8'))
+            loop = asyncio.get_running_loop()
+            parse = partial(timed_parse, source.parser, html)
+            pool = executor or get_parser_pool()
+            try:
+                result['data'], result['parse_time'] = await loop.run_in_executor(pool, parse)
+            except BrokenProcessPool:
+                if executor is not None:
+                    raise
+                print(f"[{source.name}] parser pool broken, restarting it and retrying once")
+                reset_parser_pool(pool)
+                result['data'], result['parse_time'] = await loop.run_in_executor(get_parser_pool(), parse)
+            # Timed in the worker, metrics recorded there would stay in that process
+            PARSE_SECONDS.observe(result['parse_time'], source=source.name)
+    except Exception as e:
+        result['error'] = str(e)
+    result['total_time'] = time.perf_counter() - started
+    return result
+
+async def scrape_sources(sources: Optional[Iterable[Source]] = None, executor=None) -> Dict[str, Dict[str, Any]]:
+    # Fetches run concurrently on the event loop, parses run in parallel across worker processes
+    sources = list(registry if sources is None else sources)
+    results = await asyncio.gather(*(scrape_source(source, executor) for source in sources))
+    for result in results:
+        status = 'unchanged' if result['unchanged'] else (f"error: {result['error']}" if result['error'] else f"{result['bytes']} bytes")
+        print(f"[{result['name']}] fetch {result['fetch_time'] * 1000:.0f} ms, "
+              f"parse {result['parse_time'] * 1000:.0f} ms, {status}")
+    return {result['name']: result for result in results}
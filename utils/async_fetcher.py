@@ -0,0 +1,118 @@
+import asyncio
+import codecs
+import os
+from typing import AsyncIterator, Optional, Tuple
+import aiohttp
+from utils import metrics
+from utils.metrics import FETCH_BYTES, FETCH_SECONDS, FETCH_SIZE
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
+}
+
+def record_fetch(text: str):
+    if not metrics.enabled():
+        return
+    size = len(text.encode('utf-8')) if text else 0
+    FETCH_BYTES.inc(size)
+    FETCH_SIZE.observe(size)
+
+class AsyncFetcher:
+    def __init__(self, total_timeout: float = 20, connect_timeout: float = 5,
+                 max_connections: int = 10, max_concurrency: int = 4,
+                 keepalive_timeout: float = 75, headers: Optional[dict] = None):
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.max_concurrency = max_concurrency
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        # The session is created lazily so it binds to the running event loop
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers,
+            )
+        return self.session
+
+    async def fetch_text(self, url: str) -> str:
+        session = await self.get_session()
+        async with self.semaphore:
+            with FETCH_SECONDS.time(status='error') as timer:
+                async with session.get(url) as response:
+                    timer.labels = {'status': response.status}
+                    response.raise_for_status()
+                    text = await response.text()
+        record_fetch(text)
+        return text
+
+    async def fetch_conditional(self, url: str, etag: Optional[str] = None,
+                                last_modified: Optional[str] = None) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        # Returns (text, etag, last_modified); text is None when the server answered 304
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        session = await self.get_session()
+        async with self.semaphore:
+            with FETCH_SECONDS.time(status='error') as timer:
+                async with session.get(url, headers=headers) as response:
+                    timer.labels = {'status': response.status}
+                    if response.status == 304:
+                        return None, etag, last_modified
+                    response.raise_for_status()
+                    text = await response.text()
+                    validators = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        record_fetch(text)
+        return (text, *validators)
+
+    async def stream_text(self, url: str, chunk_size: int = 16384) -> AsyncIterator[str]:
+        # Decodes the body incrementally so a multi-byte character split across chunks is kept whole
+        session = await self.get_session()
+        async with self.semaphore:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    yield tail
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+_fetcher: Optional[AsyncFetcher] = None
+
+def get_fetcher() -> AsyncFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = AsyncFetcher(
+            total_timeout=float(os.getenv('FETCH_TIMEOUT', 20)),
+            connect_timeout=float(os.getenv('FETCH_CONNECT_TIMEOUT', 5)),
+            max_connections=int(os.getenv('FETCH_MAX_CONNECTIONS', 10)),
+            max_concurrency=int(os.getenv('FETCH_MAX_CONCURRENCY', 4)),
+        )
+    return _fetcher
+
+async def close_fetcher():
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+DEFAULT_TTL = 2 * 24 * 3600
+DEFAULT_MAX_SIZE = 5000
+
+class MatchStateStore:
+    # Last seen value per match with a per-entry TTL and LRU eviction past max_size.
+    # Expiry uses wall-clock time so entries reloaded from a backend keep their deadline.
+    def __init__(self, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, backend=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.dirty = set()
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set(self, key, value, ttl=None):
+        previous = self.entries.get(key)
+        self.entries[key] = (value, time.time() + (ttl or self.ttl))
+        self.entries.move_to_end(key)
+        if previous is None or previous[0] != value:
+            # Refreshing the deadline of an unchanged value is not worth a backend write
+            self.dirty.add(key)
+        while len(self.entries) > self.max_size:
+            evicted, _ = self.entries.popitem(last=False)
+            self.dirty.discard(evicted)
+
+    def expire(self):
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self.entries.items() if expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+            self.dirty.discard(key)
+        return len(expired)
+
+    async def load(self):
+        if self.backend is None:
+            return 0
+        now = time.time()
+        for key, value, expires_at in sorted(await self.backend.load(), key=lambda entry: entry[2]):
+            if expires_at > now:
+                self.entries[key] = (value, expires_at)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return len(self.entries)
+
+    async def flush(self):
+        if self.backend is None or not self.dirty:
+            return
+        changed = {key: self.entries[key] for key in self.dirty if key in self.entries}
+        self.dirty = set()
+        try:
+            await self.backend.save(self.entries, changed)
+        except Exception as e:
+            self.dirty.update(changed)
+            print(f"Error persisting match state: {str(e)}")
+
+class FileStateBackend:
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            return [tuple(entry) for entry in json.load(f)]
+
+    def _write(self, entries):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([[key, value, expires_at] for key, (value, expires_at) in entries], f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def load(self):
+        return await asyncio.to_thread(self._read)
+
+    async def save(self, entries, changed):
+        # The whole (bounded) store is rewritten atomically
+        await asyncio.to_thread(self._write, list(entries.items()))
+
+class MongoStateBackend:
+    def __init__(self, collection, owner):
+        self.collection = collection
+        self.owner = owner
+        self.index_ready = False
+
+    async def load(self):
+        entries = []
+        async for doc in self.collection.find({'owner': self.owner}):
+            entries.append((doc['key'], doc['value'], doc['expires_at'].replace(tzinfo=timezone.utc).timestamp()))
+        return entries
+
+    async def save(self, entries, changed):
+        if not self.index_ready:
+            # Mongo drops expired entries on its own
+            await self.collection.create_index('expires_at', expireAfterSeconds=0)
+            self.index_ready = True
+        await self.collection.bulk_write([
+            UpdateOne(
+                {'_id': f"{self.owner}|{key}"},
+                {'$set': {
+                    'owner': self.owner,
+                    'key': key,
+                    'value': value,
+                    'expires_at': datetime.fromtimestamp(expires_at, timezone.utc),
+                }},
+                upsert=True,
+            )
+            for key, (value, expires_at) in changed.items()
+        ], ordered=False)
+
+def create_match_state_store(owner, mongodb_client=None):
+    # MATCH_STATE_BACKEND: 'mongo', 'file' (MATCH_STATE_DIR) or 'memory'
+    backend_name = os.getenv('MATCH_STATE_BACKEND', 'mongo' if mongodb_client is not None else 'memory')
+    backend = None
+    if backend_name == 'mongo' and mongodb_client is not None:
+        backend = MongoStateBackend(mongodb_client.db['match_state'], owner)
+    elif backend_name == 'file':
+        backend = FileStateBackend(os.path.join(os.getenv('MATCH_STATE_DIR', '.'), f'match_state_{owner}.json'))
+    return MatchStateStore(
+        ttl=float(os.getenv('MATCH_STATE_TTL', DEFAULT_TTL)),
+        max_size=int(os.getenv('MATCH_STATE_MAX_SIZE', DEFAULT_MAX_SIZE)),
+        backend=backend,
+    )
@@ -0,0 +1,37 @@
+import re
+from functools import lru_cache
+
+# '2 - 1', also '2-1' and the odd non-breaking or doubled space. Only dashes separate a score,
+# a kick-off time such as '20:45' in the score column is not one.
+SCORE_PATTERN = re.compile(r'^\s*(\d+)\s*[-–]\s*(\d+)\s*$')
+# Asian handicap as goal1 prints it: '0', '0.5', '-0.5/1', '1/1.5'. A split line is two
+# half stakes, so its value is the mean of both ends, '0.5/1' is 0.75. A leading sign covers
+# both ends unless the second carries its own, '0/-0.5' is -0.25.
+ODDS_PATTERN = re.compile(r'^\s*([+-]?)\s*(\d+(?:\.\d+)?)(?:\s*/\s*([+-]?)\s*(\d+(?:\.\d+)?))?\s*$')
+
+CACHE_SIZE = 256
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_score(text):
+    # (home, away) goals, (None, None) before kick-off or for anything that is not a score
+    match = SCORE_PATTERN.match(text or '')
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_odds(text):
+    match = ODDS_PATTERN.match(text or '')
+    if not match:
+        return None
+    sign, low, high_sign, high = match.groups()
+    low = -float(low) if sign == '-' else float(low)
+    if not high:
+        return low
+    high = -float(high) if (high_sign or sign) == '-' else float(high)
+    return (low + high) / 2
+
+def typed_match_fields(score, odds):
+    # Stored next to the raw page text, written by GoalDataSaver at ingest
+    score_home, score_away = parse_score(score)
+    return {'score_home': score_home, 'score_away': score_away, 'odds_line': parse_odds(odds)}
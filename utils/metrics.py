@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def enabled():
+    # METRICS_ENABLED=0 turns every counter, histogram and span into an early return. Read on first
+    # use rather than at import, the entry points only load .env after importing this module.
+    return os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not enabled():
+            return
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last one is +Inf), sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not enabled():
+            return
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        return Timer(self, labels) if enabled() else NOOP_TIMER
+
+    def render(self):
+        with self.lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self.values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+class Timer:
+    # Context manager (sync or async code) that observes the elapsed time on exit
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.labels = {**self.labels, 'outcome': 'error'}
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+class _NoopTimer:
+    elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_TIMER = _NoopTimer()
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        # Re-registering a name returns the existing metric, so module reloads stay harmless
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'goal_stage_seconds', 'Duration of a pipeline stage (scrape, parse, save, notify ...)', ('stage', 'outcome'))
+FETCH_SECONDS = registry.histogram('goal_fetch_seconds', 'HTTP fetch latency', ('status',))
+FETCH_BYTES = registry.counter('goal_fetch_bytes_total', 'Bytes of page text fetched')
+FETCH_SIZE = registry.histogram('goal_fetch_size_bytes', 'Size of fetched pages', buckets=SIZE_BUCKETS)
+PARSE_SECONDS = registry.histogram('goal_parse_seconds', 'HTML parse time', ('source',))
+MATCHES_PARSED = registry.counter('goal_matches_parsed_total', 'Matches read from scraped pages')
+BULK_WRITE_SECONDS = registry.histogram('goal_bulk_write_seconds', 'Latency of one bulk_write round trip', ('collection',))
+BULK_WRITE_OPS = registry.counter('goal_bulk_write_ops_total', 'Operations sent through bulk_write', ('collection',))
+NOTIFY_SECONDS = registry.histogram('goal_notify_seconds', 'Latency of one notification send', ('channel',))
+NOTIFY_SENT = registry.counter('goal_notify_sent_total', 'Notifications delivered', ('channel',))
+NOTIFY_FAILURES = registry.counter('goal_notify_failures_total', 'Notification send attempts that failed', ('channel',))
+
+def span(stage):
+    # Per-stage timing span: `with span('save'):` records goal_stage_seconds{stage="save"}
+    if not enabled():
+        return NOOP_TIMER
+    return Timer(STAGE_SECONDS, {'stage': stage, 'outcome': 'ok'})
+
+def render_metrics():
+    return registry.render()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+async def start_metrics_server(port=None):
+    # The pipeline records its metrics in this process, web_api's /metrics only sees its own.
+    # METRICS_PORT=0 (or metrics disabled) skips the exporter; returns the runner to clean up.
+    port = int(os.getenv('METRICS_PORT', 9100) if port is None else port)
+    if not enabled() or not port:
+        return None
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(body=render_metrics().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    print(f"Serving pipeline metrics on :{port}/metrics")
+    return runner
@@ -0,0 +1,58 @@
+from html import escape
+from utils.telegram_delivery import MAX_MESSAGE_LENGTH
+
+SCHEDULE_HEADER = "📅 <b>ตารางการแข่งขันฟุตบอลวันนี้</b> 📅{part}\n<code>{league}</code>\n\n"
+SCHEDULE_PART = " ({index}/{total})"
+SCHEDULE_MATCH = (
+    "<code>"
+    "🏠 <b>ทีมเหย้า:</b> {home_team}\n"
+    "🛫 <b>ทีมเยือน:</b> {away_team}\n"
+    "⚽ <b>ผลการแข่งขัน:</b> {score}\n"
+    "💰 <b>ราคาบอล:</b> {odds}\n"
+    "🔮 <b>ทรรศนะฟุตบอลวันนี้:</b> {signal}\n"
+    "🕒 <b>เวลาเตะ:</b> {bangkok_time}\n"
+    "⎯⎯⎯⎯⎯⎯⎯⎯⎯⎯⎯"
+    "</code>\n"
+)
+SCHEDULE_FOOTER = "#{tag}\n\n"
+
+def render_match_block(match):
+    return SCHEDULE_MATCH.format(
+        home_team=escape(str(match.get('home_team', ''))),
+        away_team=escape(str(match.get('away_team', ''))),
+        score=escape(str(match.get('score', ''))),
+        odds=escape(str(match.get('odds', ''))),
+        signal=escape(str(match.get('signal') or 'ไม่มีข้อมูล')),
+        bangkok_time=escape(str(match.get('bangkok_time', ''))),
+    )
+
+def render_league_messages(league, matches, limit=MAX_MESSAGE_LENGTH):
+    # Matches are packed into as few messages as fit the limit; every part repeats the header and footer.
+    # len() counts the raw HTML, which is always more than the visible text Telegram measures.
+    header_league = escape(league)
+    footer = SCHEDULE_FOOTER.format(tag=escape(league.replace(' ', '')))
+    reserved = len(SCHEDULE_HEADER.format(part=SCHEDULE_PART.format(index=99, total=99), league=header_league)) + len(footer)
+    budget = limit - reserved
+
+    chunks = [[]]
+    size = 0
+    for match in matches:
+        block = render_match_block(match)
+        if len(block) > budget:
+            # Cutting the HTML could leave a tag or entity open and Telegram would reject the message
+            print(f"Schedule entry for {match.get('home_team')} vs {match.get('away_team')} does not fit a message, skipped")
+            continue
+        if chunks[-1] and size + len(block) > budget:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(block)
+        size += len(block)
+
+    total = len(chunks)
+    return [
+        SCHEDULE_HEADER.format(
+            part=SCHEDULE_PART.format(index=index, total=total) if total > 1 else '',
+            league=header_league,
+        ) + ''.join(blocks) + footer
+        for index, blocks in enumerate(chunks, 1)
+    ]
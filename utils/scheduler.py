@@ -0,0 +1,190 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+import pytz
+
+BANGKOK_TZ = pytz.timezone('Asia/Bangkok')
+
+LIVE_INTERVAL = 10
+IDLE_INTERVAL = 15 * 60
+PREMATCH_LEAD = 5 * 60
+# 90 minutes, half time and stoppage, with room for a late kickoff
+MATCH_DURATION = 150 * 60
+KICKOFF_REFRESH = 5 * 60
+# A goal1 day table runs into the small hours: a 00:30 or 02:00 kickoff listed under the evening's
+# table is played the next calendar day
+DAY_ROLLOVER_HOUR = 6
+
+# Cron loops never sleep longer than this, so clock jumps and suspends cannot skip a slot
+MAX_CRON_SLEEP = 60
+
+def kickoff_utc(match):
+    # matches_data.date holds the Bangkok calendar day (stored shifted by +7h), bangkok_time the local kickoff
+    hour, minute = map(int, match['bangkok_time'].split(':'))
+    local = match['date'].replace(hour=hour, minute=minute, second=0, microsecond=0, tzinfo=None)
+    if hour < DAY_ROLLOVER_HOUR:
+        local += timedelta(days=1)
+    return BANGKOK_TZ.localize(local).astimezone(pytz.UTC)
+
+class KickoffSchedule:
+    # Polling interval derived from the kickoff times in matches_data: live_interval while any match
+    # is in its window (prematch_lead before kickoff to match_duration after), otherwise sleep until
+    # the next window opens, capped at idle_interval
+    def __init__(self, collection, live_interval=LIVE_INTERVAL, idle_interval=IDLE_INTERVAL,
+                 prematch_lead=PREMATCH_LEAD, match_duration=MATCH_DURATION, refresh_interval=KICKOFF_REFRESH):
+        self.collection = collection
+        self.live_interval = live_interval
+        self.idle_interval = idle_interval
+        self.prematch_lead = prematch_lead
+        self.match_duration = match_duration
+        self.refresh_interval = refresh_interval
+        self.kickoffs = []
+        self.loaded_at = None
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    async def refresh(self, now=None):
+        now = now or datetime.now(pytz.UTC)
+        # Stored dates are Bangkok wall-clock time, so the query range is shifted the same way
+        shifted = now.astimezone(pytz.UTC).replace(tzinfo=None) + timedelta(hours=7)
+        query = {'date': {
+            '$gte': (shifted - timedelta(seconds=self.match_duration, days=1)).replace(hour=0, minute=0, second=0, microsecond=0),
+            '$lte': shifted + timedelta(days=2),
+        }}
+        kickoffs = []
+        async for match in self.collection.find(query, {'date': 1, 'bangkok_time': 1}):
+            try:
+                kickoffs.append(kickoff_utc(match).timestamp())
+            except (KeyError, ValueError, AttributeError):
+                continue
+        self.kickoffs = sorted(kickoffs)
+        self.loaded_at = time.monotonic()
+
+    def is_live(self, now=None):
+        ts = (now or datetime.now(pytz.UTC)).timestamp()
+        i = bisect_left(self.kickoffs, ts - self.match_duration)
+        return i < len(self.kickoffs) and self.kickoffs[i] <= ts + self.prematch_lead
+
+    def interval(self, now=None):
+        now = now or datetime.now(pytz.UTC)
+        if self.is_live(now):
+            return self.live_interval
+        ts = now.timestamp()
+        i = bisect_right(self.kickoffs, ts + self.prematch_lead)
+        if i == len(self.kickoffs):
+            return self.idle_interval
+        return max(self.live_interval, min(self.idle_interval, self.kickoffs[i] - self.prematch_lead - ts))
+
+    async def next_interval(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_interval:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep the previous kickoffs, or poll at the live rate if there never were any
+                print(f"Error loading kickoff times: {str(e)}")
+                if self.loaded_at is None:
+                    return self.live_interval
+        return self.interval()
+
+def create_kickoff_schedule(collection):
+    return KickoffSchedule(
+        collection,
+        live_interval=float(os.getenv('POLL_LIVE_INTERVAL', LIVE_INTERVAL)),
+        idle_interval=float(os.getenv('POLL_IDLE_INTERVAL', IDLE_INTERVAL)),
+        prematch_lead=float(os.getenv('POLL_PREMATCH_LEAD', PREMATCH_LEAD)),
+        match_duration=float(os.getenv('POLL_MATCH_DURATION', MATCH_DURATION)),
+    )
+
+class DailyJob:
+    def __init__(self, name, hour, minute, func, tz=BANGKOK_TZ, misfire_grace=3600, retry_delay=60):
+        self.name = name
+        self.hour = hour
+        self.minute = minute
+        self.func = func
+        self.tz = tz
+        self.misfire_grace = misfire_grace
+        self.retry_delay = retry_delay
+        self.last_run = None
+
+    def slot(self, day):
+        return self.tz.localize(datetime(day.year, day.month, day.day, self.hour, self.minute))
+
+    def previous_slot(self, now):
+        slot = self.slot(now.date())
+        return slot if slot <= now else self.slot(now.date() - timedelta(days=1))
+
+    def next_slot(self, now):
+        slot = self.slot(now.date())
+        return slot if slot > now else self.slot(now.date() + timedelta(days=1))
+
+class Scheduler:
+    # Runs daily jobs at a wall-clock time in their timezone. Each loop fires the most recent slot
+    # if it has not run yet and is no older than misfire_grace, so a late wakeup or a restart just
+    # after the slot still runs the job. A slot only counts as run once the job succeeded, a failing
+    # job is retried every retry_delay until the grace period is over. With a state collection the
+    # last run survives restarts.
+    def __init__(self, state_collection=None):
+        self.state_collection = state_collection
+        self.jobs = []
+        self.tasks = []
+
+    def daily(self, name, at, func, tz=BANGKOK_TZ, misfire_grace=3600, retry_delay=60):
+        # at is 'HH:MM'
+        hour, minute = map(int, at.split(':'))
+        job = DailyJob(name, hour, minute, func, tz, misfire_grace, retry_delay)
+        self.jobs.append(job)
+        return job
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._run_job(job)) for job in self.jobs]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _load_last_run(self, job):
+        if self.state_collection is None:
+            return
+        try:
+            doc = await self.state_collection.find_one({'_id': job.name})
+            if doc and doc.get('last_run'):
+                last_run = doc['last_run']
+                if last_run.tzinfo is None:
+                    last_run = pytz.UTC.localize(last_run)
+                job.last_run = last_run.astimezone(job.tz)
+        except Exception as e:
+            print(f"Error loading state of job {job.name}: {str(e)}")
+
+    async def _save_state(self, job, fields):
+        if self.state_collection is None:
+            return
+        try:
+            await self.state_collection.update_one({'_id': job.name}, {'$set': fields}, upsert=True)
+        except Exception as e:
+            print(f"Error saving state of job {job.name}: {str(e)}")
+
+    async def _run_job(self, job):
+        await self._load_last_run(job)
+        while True:
+            now = datetime.now(job.tz)
+            slot = job.previous_slot(now)
+            if (job.last_run is None or job.last_run < slot) and (now - slot).total_seconds() <= job.misfire_grace:
+                print(f"Running job {job.name} for {slot.strftime('%Y-%m-%d %H:%M')}")
+                try:
+                    await job.func()
+                except Exception as e:
+                    print(f"Error running job {job.name}, retrying in {job.retry_delay}s: {str(e)}")
+                    await self._save_state(job, {'last_error': str(e), 'last_failure': datetime.now(pytz.UTC)})
+                    await asyncio.sleep(job.retry_delay)
+                    continue
+                # Saved after the run: a crash in between repeats the job rather than skipping the day
+                job.last_run = slot
+                await self._save_state(job, {'last_run': slot.astimezone(pytz.UTC)})
+            wait = (job.next_slot(datetime.now(job.tz)) - datetime.now(job.tz)).total_seconds()
+            await asyncio.sleep(min(max(wait, 0.5), MAX_CRON_SLEEP))
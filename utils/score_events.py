@@ -0,0 +1,57 @@
+import asyncio
+from typing import List, Optional
+from pymongo.errors import PyMongoError
+
+class ScoreEventBus:
+    # In-process pub/sub: GoalDataSaver publishes changed matches, notifiers each get their own queue
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.subscribers: List[asyncio.Queue] = []
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def publish(self, match: dict):
+        for queue in self.subscribers:
+            if queue.full():
+                # A stalled subscriber loses its oldest event rather than blocking the scraper
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(match)
+
+_bus: Optional[ScoreEventBus] = None
+
+def get_score_bus() -> ScoreEventBus:
+    global _bus
+    if _bus is None:
+        _bus = ScoreEventBus()
+    return _bus
+
+SCORE_CHANGE_PIPELINE = [
+    {'$match': {
+        'operationType': 'update',
+        'updateDescription.updatedFields.score': {'$exists': True},
+    }},
+]
+
+async def watch_score_changes(collection, bus: ScoreEventBus, retry_delay: float = 5):
+    # Feeds the bus from a MongoDB change stream (replica set required), resuming after errors
+    resume_token = None
+    while True:
+        try:
+            async with collection.watch(SCORE_CHANGE_PIPELINE, full_document='updateLookup',
+                                        resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    if change.get('fullDocument'):
+                        bus.publish(change['fullDocument'])
+        except PyMongoError as e:
+            print(f"Change stream error, retrying in {retry_delay}s: {str(e)}")
+            await asyncio.sleep(retry_delay)
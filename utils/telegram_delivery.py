@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import deque
+from utils.metrics import NOTIFY_FAILURES, NOTIFY_SECONDS, NOTIFY_SENT
+
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = '\n\n➖➖➖➖➖\n\n'
+
+# Telegram allows roughly 30 messages/s overall, 1/s per private chat and 20/min per group
+GLOBAL_RATE = 30
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class DeliveryItem:
+    def __init__(self, text, merge_key=None, on_sent=None):
+        self.text = text
+        self.merge_key = merge_key
+        self.attempts = 0
+        # Awaited once the text has reached Telegram, merged updates keep every callback
+        self.on_sent = [on_sent] if on_sent else []
+
+class ChatQueue:
+    def __init__(self, bucket):
+        self.items = deque()
+        self.bucket = bucket
+        self.scheduled = False
+
+def retry_after(error):
+    # telebot's ApiTelegramException carries the 429 payload in result_json
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    result = getattr(error, 'result_json', None) or {}
+    return (result.get('parameters') or {}).get('retry_after', 1)
+
+class TelegramDeliveryQueue:
+    def __init__(self, bot, workers=2, global_rate=GLOBAL_RATE, max_retries=5, parse_mode='HTML', drain_timeout=10):
+        self.bot = bot
+        self.drain_timeout = drain_timeout
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.max_retries = max_retries
+        self.parse_mode = parse_mode
+        self.chats = {}
+        self.ready = None
+        self.tasks = []
+        self.stats = {'queued': 0, 'merged': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+    def start(self):
+        if not self.tasks:
+            self.ready = self.ready or asyncio.Queue()
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Give queued messages drain_timeout to go out (shutdown, lease handover), then report the rest
+        if self.tasks and self.ready is not None:
+            try:
+                await asyncio.wait_for(self.ready.join(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        dropped = {chat_id: len(chat.items) for chat_id, chat in self.chats.items() if chat.items}
+        if dropped:
+            print(f"Telegram delivery stopped with {sum(dropped.values())} messages undelivered: {dropped}")
+
+    async def join(self):
+        if self.ready is not None:
+            await self.ready.join()
+
+    def enqueue(self, chat_id, text, merge_key=None, on_sent=None):
+        # Items with a merge_key are goal updates: a newer update for the same key replaces the
+        # queued one, and consecutive updates for a chat are sent together in one message
+        if self.ready is None:
+            self.ready = asyncio.Queue()
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            rate = GROUP_CHAT_RATE if str(chat_id).startswith('-') else PRIVATE_CHAT_RATE
+            chat = self.chats[chat_id] = ChatQueue(TokenBucket(rate))
+        self.stats['queued'] += 1
+        if merge_key is not None:
+            for item in chat.items:
+                if item.merge_key == merge_key:
+                    item.text = text
+                    if on_sent:
+                        item.on_sent.append(on_sent)
+                    self.stats['merged'] += 1
+                    return
+        chat.items.append(DeliveryItem(text, merge_key, on_sent))
+        if not chat.scheduled:
+            chat.scheduled = True
+            self.ready.put_nowait(chat_id)
+
+    def _take_batch(self, chat):
+        batch = [chat.items.popleft()]
+        if batch[0].merge_key is None:
+            return batch
+        length = len(batch[0].text)
+        while chat.items and chat.items[0].merge_key is not None:
+            next_length = length + len(MERGE_SEPARATOR) + len(chat.items[0].text)
+            if next_length > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(chat.items.popleft())
+            length = next_length
+        if len(batch) > 1:
+            self.stats['merged'] += len(batch) - 1
+        return batch
+
+    async def _worker(self):
+        while True:
+            chat_id = await self.ready.get()
+            chat = self.chats[chat_id]
+            try:
+                await chat.bucket.acquire()
+                await self.global_bucket.acquire()
+                await self._send(chat_id, chat, self._take_batch(chat))
+            except Exception as e:
+                print(f"Telegram delivery worker error: {str(e)}")
+            finally:
+                if chat.items:
+                    self.ready.put_nowait(chat_id)
+                else:
+                    chat.scheduled = False
+                self.ready.task_done()
+
+    async def _send(self, chat_id, chat, batch):
+        text = MERGE_SEPARATOR.join(item.text for item in batch)
+        try:
+            with NOTIFY_SECONDS.time(channel='telegram'):
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=self.parse_mode)
+            self.stats['sent'] += 1
+            NOTIFY_SENT.inc(channel='telegram')
+            await self._delivered(batch)
+            return
+        except Exception as e:
+            NOTIFY_FAILURES.inc(channel='telegram')
+            wait = retry_after(e)
+            if wait is not None:
+                # Flood control is not the message's fault, it does not count as an attempt
+                print(f"Telegram rate limit hit for {chat_id}, retrying after {wait}s")
+                chat.bucket.pause(wait)
+                # Flood control also applies bot-wide, other chats hold off as well
+                self.global_bucket.pause(wait)
+            else:
+                for item in batch:
+                    item.attempts += 1
+                if batch[0].attempts > self.max_retries:
+                    self.stats['failed'] += 1
+                    print(f"Dropping Telegram message for {chat_id} after {batch[0].attempts} attempts: {str(e)}")
+                    return
+                chat.bucket.pause(min(2 ** batch[0].attempts, 60))
+                print(f"Error sending Telegram message, retry {batch[0].attempts}: {str(e)}")
+        self.stats['retried'] += 1
+        chat.items.extendleft(reversed(batch))
+
+    async def _delivered(self, batch):
+        # Outside the retry path: the message is out, a failing callback must not send it again
+        for item in batch:
+            for callback in item.on_sent:
+                try:
+                    await callback()
+                except Exception as e:
+                    print(f"Error recording Telegram delivery: {str(e)}")
@@ -1,50 +1,83 @@
 import re
 from datetime import datetime, timezone
+from functools import lru_cache
 from utils.test_data import test_cases
 
-class ThaiDateConverter:
-    def __init__(self):
-        self.thai_months = [
-            'มกราคม', 'กุมภาพันธ์', 'มีนาคม', 'เมษายน', 'พฤษภาคม', 'มิถุนายน',
-            'กรกฎาคม', 'สิงหาคม', 'กันยายน', 'ตุลาคม', 'พฤศจิกายน', 'ธันวาคม'
-        ]
-        self.thai_days = [
-            'จันทร์', 'อังคาร', 'พุธ', 'พฤหัสบดี', 'ศุกร์', 'เสาร์', 'อาทิตย์'
-        ]
+THAI_MONTHS = [
+    'มกราคม', 'กุมภาพันธ์', 'มีนาคม', 'เมษายน', 'พฤษภาคม', 'มิถุนายน',
+    'กรกฎาคม', 'สิงหาคม', 'กันยายน', 'ตุลาคม', 'พฤศจิกายน', 'ธันวาคม'
+]
+THAI_MONTH_ABBREVIATIONS = [
+    'ม.ค.', 'ก.พ.', 'มี.ค.', 'เม.ย.', 'พ.ค.', 'มิ.ย.',
+    'ก.ค.', 'ส.ค.', 'ก.ย.', 'ต.ค.', 'พ.ย.', 'ธ.ค.'
+]
+THAI_DAYS = [
+    'จันทร์', 'อังคาร', 'พุธ', 'พฤหัสบดี', 'ศุกร์', 'เสาร์', 'อาทิตย์'
+]
 
-    def extract_date_and_time(self, text):
-        pattern = r'(?:วัน(จันทร์|อังคาร|พุธ|พฤหัสบดี|ศุกร์|เสาร์|อาทิตย์)?(?:ที่)?)??\s*(\d{1,2})\s*(มกราคม|กุมภาพันธ์|มีนาคม|เมษายน|พฤษภาคม|มิถุนายน|กรกฎาคม|สิงหาคม|กันยายน|ตุลาคม|พฤศจิกายน|ธันวาคม)\s*(?:พ\.ศ\.)?\s*(\d{4})(?:\s*เวลา\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(น\.|นาฬิกา)?)?'
-        match = re.search(pattern, text)
-        if match:
-            return match.groups()
+# Full names and abbreviations both map straight to the month number
+MONTH_NUMBERS = {name: number for number, name in enumerate(THAI_MONTHS, start=1)}
+MONTH_NUMBERS.update({name: number for number, name in enumerate(THAI_MONTH_ABBREVIATIONS, start=1)})
+
+DATE_PATTERN = re.compile(
+    r'(?:วัน(' + '|'.join(THAI_DAYS) + r')?(?:ที่)?)??\s*(\d{1,2})\s*('
+    + '|'.join(re.escape(name) for name in THAI_MONTHS + THAI_MONTH_ABBREVIATIONS)
+    + r')\s*(?:พ\.ศ\.)?\s*(\d{4})(?:\s*เวลา\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(น\.|นาฬิกา)?)?'
+)
+
+CACHE_SIZE = 1024
+
+def extract_date_and_time(text):
+    match = DATE_PATTERN.search(text)
+    if match:
+        return match.groups()
+    return None
+
+def parse_thai_date_and_time(parts):
+    if not parts or len(parts) < 4:
         return None
 
-    def parse_thai_date_and_time(self, parts):
-        if not parts or len(parts) < 4:
-            return None
+    day = int(parts[1])
+    month = MONTH_NUMBERS[parts[2]]
+    year = int(parts[3]) - 543  # แปลงปี พ.ศ. เป็น ค.ศ.
+
+    hour = int(parts[4]) if parts[4] else 0
+    minute = int(parts[5]) if parts[5] else 0
+    second = int(parts[6]) if parts[6] else 0
 
-        day = int(parts[1])
-        month = self.thai_months.index(parts[2]) + 1
-        year = int(parts[3]) - 543  # แปลงปี พ.ศ. เป็น ค.ศ.
+    try:
+        date_obj = datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+        return date_obj
+    except ValueError as e:
+        print(f"เกิดข้อผิดพลาดในการแปลงวันที่และเวลา: {e}")
+        return None
 
-        hour = int(parts[4]) if parts[4] else 0
-        minute = int(parts[5]) if parts[5] else 0
-        second = int(parts[6]) if parts[6] else 0
+@lru_cache(maxsize=CACHE_SIZE)
+def to_utc_format(text):
+    # The same day header is converted for every league on the page, so results are memoised
+    parts = extract_date_and_time(text)
+    if parts:
+        date_obj = parse_thai_date_and_time(parts)
+        if date_obj:
+            return date_obj.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    return None
 
-        try:
-            date_obj = datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
-            return date_obj
-        except ValueError as e:
-            print(f"เกิดข้อผิดพลาดในการแปลงวันที่และเวลา: {e}")
-            return None
+class ThaiDateConverter:
+    def __init__(self):
+        self.thai_months = THAI_MONTHS
+        self.thai_days = THAI_DAYS
+
+    def extract_date_and_time(self, text):
+        return extract_date_and_time(text)
+
+    def parse_thai_date_and_time(self, parts):
+        return parse_thai_date_and_time(parts)
 
     def to_utc_format(self, text):
-        parts = self.extract_date_and_time(text)
-        if parts:
-            date_obj = self.parse_thai_date_and_time(parts)
-            if date_obj:
-                return date_obj.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
-        return None
+        return to_utc_format(text)
+
+    def to_utc_format_many(self, texts):
+        return [to_utc_format(text) for text in texts]
 
 if __name__ == "__main__":
     converter = ThaiDateConverter()
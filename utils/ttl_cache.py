@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class CacheEntry:
+    def __init__(self, value: Any):
+        self.value = value
+        # Rendered once per refresh so every hit is served without re-serialising
+        self.body = json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        self.fetched_at = time.monotonic()
+        self.used_at = self.fetched_at
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+class AsyncTTLCache:
+    def __init__(self, loader: Callable[[Hashable], Awaitable[Any]], ttl: float = 60, stale_ttl: float = 300,
+                 max_entries: Optional[int] = 64):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Least recently used keys are evicted past max_entries, so neither memory nor the
+        # refresher's work grows with the number of distinct keys clients ask for
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    async def get(self, key: Hashable) -> CacheEntry:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            entry.used_at = time.monotonic()
+            age = entry.age()
+            if age < self.ttl:
+                self.hits += 1
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                # Serve the stale copy right away and revalidate in the background
+                self.hits += 1
+                self.refresh(key)
+                return entry
+        self.misses += 1
+        return await asyncio.shield(self.refresh(key))
+
+    def refresh(self, key: Hashable) -> asyncio.Task:
+        # Concurrent callers for the same key share one load
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self.inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable) -> CacheEntry:
+        try:
+            self.loads += 1
+            entry = CacheEntry(await self.loader(key))
+            previous = self.entries.get(key)
+            if previous is not None:
+                entry.used_at = previous.used_at
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while self.max_entries and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return entry
+        except Exception as e:
+            stale = self.entries.get(key)
+            if stale is not None:
+                print(f"Cache refresh for {key} failed, keeping stale copy: {str(e)}")
+                return stale
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def run_refresher(self, interval: float = None, keys=()):
+        # Keeps `keys` and every key read recently warm so readers rarely wait on a scrape.
+        # Keys nobody has read for a whole stale period are dropped instead of refreshed.
+        interval = interval or self.ttl
+        while True:
+            idle_after = time.monotonic() - interval - self.stale_ttl
+            for key in [key for key, entry in self.entries.items() if key not in keys and entry.used_at < idle_after]:
+                del self.entries[key]
+            for key in set(keys) | set(self.entries):
+                try:
+                    await self.refresh(key)
+                except Exception as e:
+                    print(f"Background refresh for {key} failed: {str(e)}")
+            await asyncio.sleep(interval)
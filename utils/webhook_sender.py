@@ -0,0 +1,78 @@
+import asyncio
+import random
+from typing import Dict, List, Optional
+import aiohttp
+from utils.metrics import NOTIFY_FAILURES, NOTIFY_SECONDS, NOTIFY_SENT
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class WebhookSender:
+    # Fans a payload out to every target URL over one pooled session, with bounded concurrency
+    # and exponential backoff (plus jitter) for timeouts, connection errors, 429 and 5xx responses
+    def __init__(self, urls: List[str], max_concurrency: int = 8, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 30, timeout: float = 10):
+        self.urls = urls
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.base_delay * 2 ** attempt, self.max_delay)
+        return delay * random.uniform(0.5, 1)
+
+    async def post(self, url: str, payload: dict) -> bool:
+        session = await self.get_session()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self.semaphore:
+                    with NOTIFY_SECONDS.time(channel='webhook'):
+                        async with session.post(url, json=payload) as response:
+                            status = response.status
+                            header = response.headers.get('Retry-After')
+                if status < 300:
+                    self.stats['sent'] += 1
+                    NOTIFY_SENT.inc(channel='webhook')
+                    return True
+                NOTIFY_FAILURES.inc(channel='webhook')
+                if status not in RETRY_STATUSES:
+                    print(f"Webhook {url} rejected the payload. Status: {status}")
+                    break
+                retry_after = float(header) if header and header.replace('.', '', 1).isdigit() else None
+                error = f"status {status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                NOTIFY_FAILURES.inc(channel='webhook')
+                error = str(e) or type(e).__name__
+            if attempt < self.max_retries:
+                self.stats['retried'] += 1
+                delay = self.backoff(attempt, retry_after)
+                print(f"Webhook {url} failed ({error}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        self.stats['failed'] += 1
+        return False
+
+    async def send(self, payload: dict, urls: Optional[List[str]] = None) -> Dict[str, bool]:
+        # urls narrows the fan-out, e.g. to the targets an earlier attempt did not reach
+        urls = self.urls if urls is None else urls
+        results = await asyncio.gather(*(self.post(url, payload) for url in urls))
+        return dict(zip(urls, results))
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
@@ -1,14 +1,60 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Request, Response
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 import uvicorn
 import os
 
-from db.mongo import MongoDB
-from scrapper import goal
+from db.daily_schedule import get_schedule_cache, schedule_day
+from db.indexes import ensure_match_indexes
+from db.match_queries import find_matches
+from db.match_timeline import ensure_timeline_indexes, get_timeline
+from db.mongo import close_async_mongo, get_async_mongo
+from db.names import get_name_dictionary
+from scrapper import goal_all_async
+from utils.async_fetcher import close_fetcher
+from utils.metrics import CONTENT_TYPE, render_metrics
+from utils.ttl_cache import AsyncTTLCache, CacheEntry
 
 load_dotenv()
+
+# The whole page is scraped and parsed under this one key, /goal and /goal/days are slices of it
+GOAL_PAGE = 'page'
+
+goal_cache = AsyncTTLCache(
+    lambda key: goal_all_async(),
+    ttl=float(os.getenv('GOAL_CACHE_TTL', 60)),
+    stale_ttl=float(os.getenv('GOAL_CACHE_STALE_TTL', 300)),
+    max_entries=1,
+)
+
+# Rendered slices of the current page entry, rebuilt when the page is refreshed. Keys are
+# clamped to the number of day tables, so there are at most a few of them.
+goal_views = {}
+
+async def goal_view(kind, value):
+    page = await goal_cache.get(GOAL_PAGE)
+    if goal_views.get(GOAL_PAGE) is not page:
+        goal_views.clear()
+        goal_views[GOAL_PAGE] = page
+    days = page.value
+    if kind == 'goal':
+        key = ('goal', min(value, len(days)))
+    else:
+        key = ('days', len(days) if value is None else min(value, len(days)))
+    view = goal_views.get(key)
+    if view is None:
+        if kind == 'goal':
+            # Out of range answers [] as parse_day_tables always did
+            view = CacheEntry(days[key[1]] if key[1] < len(days) else [])
+        else:
+            view = CacheEntry(days[:key[1]])
+        goal_views[key] = view
+    return view
+
 class Item(BaseModel):
     name: str
     description: str
@@ -16,10 +62,18 @@ class Item(BaseModel):
     
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.mongodb_client = MongoDB(os.getenv('MONGO_URI'), os.getenv('MONGO_DB_NAME'))
+    app.mongodb_client = get_async_mongo(os.getenv('MONGO_URI'), os.getenv('MONGO_DB_NAME'))
+    try:
+        await ensure_match_indexes(app.mongodb_client.db['matches_data'])
+        await ensure_timeline_indexes(app.mongodb_client.db['match_timeline'])
+    except Exception as e:
+        print(f"Could not create match indexes: {str(e)}")
+    refresher = asyncio.create_task(goal_cache.run_refresher(keys=[GOAL_PAGE]))
     print("✅ lifespan start")
     yield
-    app.mongodb_client.client.close()
+    refresher.cancel()
+    close_async_mongo()
+    await close_fetcher()
     print("❌ lifespan end")
 
 app = FastAPI(lifespan=lifespan)
@@ -28,17 +82,91 @@ app = FastAPI(lifespan=lifespan)
 async def root():
     return {"message": "Hello from FastAPI! Scraping"}
 
+def cached_response(request: Request, entry, cache=goal_cache):
+    headers = {
+        'ETag': entry.etag,
+        'Cache-Control': f'public, max-age={int(cache.ttl)}, stale-while-revalidate={int(cache.stale_ttl)}',
+    }
+    if_none_match = request.headers.get('if-none-match', '')
+    if entry.etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
+
 @app.get('/goal')
-async def get():
+async def get(request: Request, index: int = 0):
+    if index < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid index: {index}")
     try:
-        return goal()
+        return cached_response(request, await goal_view('goal', index))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+@app.get('/goal/days')
+async def get_days(request: Request, days: Optional[int] = None):
+    if days is not None and days < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid days: {days}")
+    try:
+        return cached_response(request, await goal_view('days', days))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/schedule')
+async def daily_schedule(request: Request, date: Optional[str] = None):
+    try:
+        day = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d') if date else schedule_day()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {date}, expected YYYY-MM-DD")
+    cache = get_schedule_cache(app.mongodb_client)
+    try:
+        return cached_response(request, await cache.get(day), cache)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/matches')
+async def list_matches(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                       league: Optional[str] = None, team: Optional[str] = None,
+                       cursor: Optional[str] = None, limit: int = 50, fields: Optional[str] = None,
+                       score_home: Optional[int] = None, score_away: Optional[int] = None,
+                       odds_min: Optional[float] = None, odds_max: Optional[float] = None):
+    try:
+        return await find_matches(
+            app.mongodb_client.db['matches_data'],
+            get_name_dictionary(app.mongodb_client),
+            date_from=date_from,
+            date_to=date_to,
+            league=league,
+            team=team,
+            cursor=cursor,
+            limit=limit,
+            fields=[field.strip() for field in fields.split(',') if field.strip()] if fields else None,
+            score_home=score_home,
+            score_away=score_away,
+            odds_min=odds_min,
+            odds_max=odds_max,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/matches/{match_id}/timeline')
+async def match_timeline(match_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    try:
+        events = await get_timeline(app.mongodb_client.db['match_timeline'], match_id, since, until)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not events and since is None and until is None:
+        raise HTTPException(status_code=404, detail=f"No timeline for match {match_id}")
+    return {'match_id': match_id, 'events': events}
+
+@app.get('/metrics')
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 @app.post("/items/")
 async def create_item(item: Item):
     try:
-        inserted_id = app.mongodb_client.create('items', item.dict())
+        inserted_id = await app.mongodb_client.create('items', item.dict())
         return {"inserted_id": str(inserted_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,60 +1,133 @@
 import asyncio
 import os
-from app.db.mongo import MongoDB
+from db.leases import create_lease, run_as_leader
+from db.mongo import get_async_mongo
+from db.names import get_name_dictionary
+from db.notification_ledger import create_goal_claims, create_notification_ledger
 from dotenv import load_dotenv
-import aiohttp
+from datetime import datetime, timedelta
+import pytz
 from pymongo.errors import PyMongoError
+from utils.match_state import create_match_state_store
+from utils.metrics import span
+from utils.scheduler import create_kickoff_schedule
+from utils.score_events import ScoreEventBus, get_score_bus, watch_score_changes
+from utils.webhook_sender import WebhookSender
 
 load_dotenv()
 
+# Everything create_message needs, names come back through the name dictionary
+MESSAGE_FIELDS = {'league_id': 1, 'home_team_id': 1, 'away_team_id': 1, 'score': 1, 'time': 1}
+
 class GoalWebhook:
-    def __init__(self):
+    def __init__(self, notify_mode=None):
         mongodb_uri = os.getenv('MONGODB_URI')
         mongodb_db_name = os.getenv('MONGODB_DB_NAME')
-        self.mongodb_client = MongoDB(mongodb_uri, mongodb_db_name)
-        self.webhook_url = os.getenv('WEBHOOK_URL')
-        self.last_scores = {}
+        self.mongodb_client = get_async_mongo(mongodb_uri, mongodb_db_name)
+        # WEBHOOK_URLS is a comma separated list, WEBHOOK_URL is still honoured
+        urls = os.getenv('WEBHOOK_URLS') or os.getenv('WEBHOOK_URL') or ''
+        self.webhook_urls = [url.strip() for url in urls.split(',') if url.strip()]
+        self.sender = WebhookSender(
+            self.webhook_urls,
+            max_concurrency=int(os.getenv('WEBHOOK_MAX_CONCURRENCY', 8)),
+            max_retries=int(os.getenv('WEBHOOK_MAX_RETRIES', 4)),
+        )
+        self.last_scores = create_match_state_store('webhook', self.mongodb_client)
+        self.ledger = create_notification_ledger(self.mongodb_client, 'webhook')
+        # matches_data stores league and team ids, messages need the names
+        self.names = get_name_dictionary(self.mongodb_client)
+        self.claims = create_goal_claims(self.ledger, self.mongodb_client, self.names, self.last_scores,
+                                         self.send_goal_notification, fields=MESSAGE_FIELDS, background=True)
+        self.notify_mode = notify_mode or os.getenv('NOTIFY_MODE', 'events')
+        self.score_bus = ScoreEventBus() if self.notify_mode == 'change_stream' else get_score_bus()
+        self.poll_schedule = create_kickoff_schedule(self.mongodb_client.db['matches_data'])
 
     async def check_for_goals(self):
         try:
-            data = self.mongodb_client.read('goal_data', {})
-            for league in data:
-                for match in league['matches']:
-                    match_id = f"{match['เจ้าบ้าน']} vs {match['ทีมเยือน']}"
-                    current_score = match['ผลบอล']
-                    
-                    if match_id in self.last_scores and self.last_scores[match_id] != current_score:
-                        await self.send_goal_notification(league['league'], match)
-                    
-                    self.last_scores[match_id] = current_score
+            now = datetime.now(pytz.UTC)
+            one_day_ago = now - timedelta(days=1)
+            matches = self.mongodb_client.db['matches_data'].find({
+                'date': {'$gte': one_day_ago, '$lte': now}
+            }, MESSAGE_FIELDS)
+
+            goals = []
+            async for match in matches:
+                previous_score = self.last_scores.get(match['_id'])
+                if previous_score is not None and previous_score != match['score']:
+                    # Recorded once delivered, a failed claim is simply found again next cycle
+                    goals.append(match)
+                else:
+                    self.last_scores.set(match['_id'], match['score'])
+
+            # All goals of a cycle are claimed in one query and go out together, the sender bounds
+            # how many requests are in flight
+            await self.claims.dispatch(await self.claims.claim(goals))
+            await self.last_scores.flush()
         except PyMongoError as e:
             print(f"Error reading from database: {str(e)}")
 
-    async def send_goal_notification(self, league, match):
-        message = (f"Goal Alert!\n"
-                   f"League: {league}\n"
-                   f"Match: {match['เจ้าบ้าน']} vs {match['ทีมเยือน']}\n"
-                   f"New Score: {match['ผลบอล']}\n"
-                   f"Time: {match['เวลา']}")
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(self.webhook_url, json={'content': message}) as response:
-                    if response.status == 204:
-                        print(f"Webhook sent successfully for {match['เจ้าบ้าน']} vs {match['ทีมเยือน']}")
-                    else:
-                        print(f"Failed to send webhook. Status: {response.status}")
-            except aiohttp.ClientError as e:
-                print(f"Error sending webhook: {str(e)}")
+    async def consume_score_events(self, queue):
+        try:
+            await self.claims.consume(queue)
+        finally:
+            self.score_bus.unsubscribe(queue)
+
+    def create_message(self, match):
+        return (f"Goal Alert!\n"
+                f"League: {match['league']}\n"
+                f"Match: {match['home_team']} vs {match['away_team']}\n"
+                f"New Score: {match['score']}\n"
+                f"Time: {match['time']}")
+
+    async def send_goal_notification(self, match, delivered=()):
+        # delivered: targets an earlier attempt of this claim already reached
+        key = self.ledger.key(match)
+        targets = [url for url in self.webhook_urls if url not in delivered]
+        with span('notify'):
+            results = await self.sender.send({'content': self.create_message(match)}, targets)
+        reached = [url for url, ok in results.items() if ok]
+        if len(reached) == len(targets):
+            # Only a goal every target got counts as seen, anything less is swept and sent again
+            await self.ledger.mark_sent([key])
+            self.last_scores.set(match['_id'], match['score'])
+            await self.last_scores.flush()
+        else:
+            await self.ledger.mark_delivered(key, reached)
+        print(f"Webhook sent to {len(reached)}/{len(targets)} targets for {match['home_team']} vs {match['away_team']}")
 
     async def run(self):
-        while True:
-            await self.check_for_goals()
-            await asyncio.sleep(60)  # Check every minute
+        if not self.webhook_urls:
+            # Goals would be claimed and never delivered, the sweep re-claiming them until max_attempts
+            print("No WEBHOOK_URLS configured, webhook notifier not started")
+            return
+        print(f"Loaded {await self.last_scores.load()} match states")
+        tasks = [asyncio.create_task(self.claims.run_sweeper())]
+        if self.notify_mode == 'change_stream':
+            tasks.append(asyncio.create_task(watch_score_changes(self.mongodb_client.db['matches_data'], self.score_bus)))
+        if self.notify_mode in ('events', 'change_stream'):
+            try:
+                await self.consume_score_events(self.score_bus.subscribe())
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await self.sender.close()
+            return
+
+        try:
+            while True:
+                await self.check_for_goals()
+                self.last_scores.expire()
+                await asyncio.sleep(await self.poll_schedule.next_interval())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.sender.close()
 
 async def main():
-    webhook = GoalWebhook()
-    await webhook.run()
+    async def run_webhook():
+        webhook = GoalWebhook(notify_mode=os.getenv('NOTIFY_MODE', 'change_stream'))
+        await webhook.run()
+    await run_as_leader(create_lease(get_async_mongo(), 'goal_webhook'), run_webhook)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file